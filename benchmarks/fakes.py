@@ -0,0 +1,256 @@
+import json
+import sys
+import threading
+import time
+import types
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Local stand-ins for the pieces of the dictation path that need hardware,
+# the network or a downloaded model. install() puts them in sys.modules, so
+# it has to run before anything from core/ or main.py is imported.
+
+
+class AudioSource:
+    # Audio the fake microphone plays into whichever stream is open
+    def __init__(self, fs=16000, block=512, speed=0.0):
+        self.fs = fs
+        self.block = block
+        self.speed = speed  # 1.0 plays in real time, 0 as fast as possible
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.done = threading.Event()
+
+    def play(self, audio):
+        self.audio = audio
+        self.done.clear()
+
+
+class FakeInputStream:
+    def __init__(self, samplerate=16000, device=None, channels=1, dtype="float32", callback=None, **kwargs):
+        self.source = fake_sounddevice.source
+        self.channels = channels
+        self.callback = callback
+        self.running = False
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        self.close()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._feed, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def close(self):
+        pass
+
+    def _feed(self):
+        source = self.source
+        audio = source.audio
+        pos = 0
+        while self.running and pos < len(audio):
+            block = audio[pos:pos + source.block]
+            pos += len(block)
+            indata = np.repeat(block[:, None], self.channels, axis=1)
+            self.callback(indata, len(block), None, None)
+            if source.speed:
+                time.sleep(len(block) / source.fs / source.speed)
+        source.done.set()
+        # A real microphone keeps delivering silence until the stream is stopped
+        silence = np.zeros((source.block, self.channels), dtype=np.float32)
+        while self.running:
+            time.sleep(source.block / source.fs)
+            if self.running:
+                self.callback(silence, source.block, None, None)
+
+
+fake_sounddevice = types.ModuleType("sounddevice")
+fake_sounddevice.source = AudioSource()
+fake_sounddevice.InputStream = FakeInputStream
+fake_sounddevice.sleep = lambda ms: time.sleep(ms / 1000)
+fake_sounddevice.query_devices = lambda *args, **kwargs: (
+    [{"name": "Benchmark microphone", "max_input_channels": 1, "default_samplerate": 16000}]
+    if not args and not kwargs else
+    {"name": "Benchmark microphone", "max_input_channels": 1, "default_samplerate": 16000}
+)
+
+
+class FakeKeyboard(types.ModuleType):
+    # Records what would have been typed instead of touching the OS
+    def __init__(self):
+        super().__init__("keyboard")
+        self.sent = []
+
+    def send(self, keys):
+        self.sent.append(keys)
+
+    def write(self, text):
+        self.sent.append(text)
+
+    def add_hotkey(self, *args, **kwargs):
+        pass
+
+    def remove_hotkey(self, *args, **kwargs):
+        pass
+
+
+fake_keyboard = FakeKeyboard()
+
+
+StubSegment = namedtuple("StubSegment", ["start", "end", "text"])
+StubInfo = namedtuple("StubInfo", ["language", "duration"])
+
+STUB_WORDS = ("the quick brown fox jumps over the lazy dog and then "
+              "sends a short note to the team about tomorrow").split()
+
+
+class StubWhisperModel:
+    # Deterministic drop-in for faster_whisper.WhisperModel. Takes load_seconds
+    # to "load" and rtf seconds per second of audio to "decode", and produces
+    # the same text for the same audio length every time.
+    load_seconds = 0.0
+    rtf = 0.0
+
+    def __init__(self, model_path, device="cpu", compute_type="int8", **kwargs):
+        time.sleep(self.load_seconds)
+
+    def transcribe(self, audio, **kwargs):
+        duration = (len(audio) / 16000) if not isinstance(audio, str) else 0.0
+        return self._segments(duration), StubInfo("en", duration)
+
+    def _segments(self, duration):
+        # Emitted lazily per 30s window like the real model
+        start = 0.0
+        index = 0
+        while start < duration:
+            end = min(duration, start + 30.0)
+            time.sleep((end - start) * self.rtf)
+            count = max(1, int((end - start) * 2.5))
+            words = [STUB_WORDS[(index + i) % len(STUB_WORDS)] for i in range(count)]
+            yield StubSegment(start, end, " " + " ".join(words))
+            index += count
+            start = end
+
+
+class FakeFormatterServer:
+    # Local stand-in for the formatter backends on 127.0.0.1: the Gemini
+    # REST API under gemini_url and an OpenAI-compatible server under
+    # openai_url, streamed or not. Answers after `latency` seconds with the
+    # user text capitalized and closed with a period. `fail_next` makes the
+    # next N requests return `fail_status`, to exercise the client's retries.
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self.connections = set()  # Client ports seen, shows whether connections are reused
+        self.fail_next = 0
+        self.fail_status = 503
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        # Clients that time out hang up mid-reply, that's expected here
+        self.httpd.handle_error = lambda request, client_address: None
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def gemini_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}/v1beta"
+
+    @property
+    def openai_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}/v1"
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    @staticmethod
+    def _format(raw):
+        text = raw.strip()
+        text = text[:1].upper() + text[1:]
+        if text and text[-1] not in ".!?":
+            text += "."
+        return text
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                server.calls += 1
+                server.connections.add(self.client_address[1])
+                if server.fail_next > 0:
+                    server.fail_next -= 1
+                    return self._reply(server.fail_status, {"error": {"message": "unavailable"}})
+                if self.path.endswith(":generateContent"):
+                    return self._gemini(body)
+                if self.path.endswith("/chat/completions"):
+                    return self._openai(body)
+                self._reply(404, {"error": {"message": "not found"}})
+
+            def _gemini(self, body):
+                if not self.headers.get("x-goog-api-key"):
+                    return self._reply(400, {"error": {"message": "missing API key"}})
+                if "systemInstruction" not in body:
+                    return self._reply(400, {"error": {"message": "missing systemInstruction"}})
+                time.sleep(server.latency)
+                text = server._format(body["contents"][-1]["parts"][0]["text"])
+                self._reply(200, {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]},
+                                                  "finishReason": "STOP"}]})
+
+            def _openai(self, body):
+                messages = body.get("messages") or []
+                if not messages or messages[0].get("role") != "system":
+                    return self._reply(400, {"error": {"message": "missing system message"}})
+                time.sleep(server.latency)
+                text = server._format(messages[-1]["content"])
+                if not body.get("stream"):
+                    return self._reply(200, {"choices": [{"index": 0, "finish_reason": "stop",
+                                                          "message": {"role": "assistant", "content": text}}]})
+
+                # Server-sent events, a few characters per chunk
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i in range(0, len(text), 8):
+                    delta = {"choices": [{"index": 0, "delta": {"content": text[i:i + 8]}}]}
+                    self._chunk(f"data: {json.dumps(delta)}\n\n")
+                self._chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, data):
+                data = data.encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def install():
+    sys.modules["sounddevice"] = fake_sounddevice
+    sys.modules["keyboard"] = fake_keyboard
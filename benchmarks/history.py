@@ -0,0 +1,109 @@
+"""Write throughput and query latency of the transcript history store.
+
+    python -m benchmarks.history
+    python -m benchmarks.history --rows 500000 --output history.json
+
+Fills a throwaway database with synthetic dictations through the real
+background writer, then times listing and searching at the newest and the
+oldest end. Run it from the repository root.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+
+from config import config
+from core.history import HistoryStore
+
+WORDS = (
+    "meeting tomorrow report budget send call email draft review project deadline client "
+    "invoice schedule team update notes follow quarter numbers design launch roadmap hiring "
+    "offsite coffee lunch thanks please remind check ship release issue fix test"
+).split()
+
+
+def fake_job(i, rng):
+    return types.SimpleNamespace(
+        id=i,
+        submitted_at=time.time() - rng.uniform(1, 3),
+        model="distil-large-v3",
+        route="default",
+        timings={"vad": 0.002, "decode": rng.uniform(0.2, 2.0), "format": rng.uniform(0.0, 0.8)},
+    )
+
+
+def fill(store, rows, seed):
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for i in range(rows):
+        text = " ".join(rng.choices(WORDS, k=rng.randint(4, 40)))
+        store.append(fake_job(i, rng), text, text.capitalize() + ".", audio_seconds=len(text) / 15)
+    queued = time.perf_counter() - start
+    store.flush()
+    return queued, time.perf_counter() - start
+
+
+def time_query(store, repeat, **kwargs):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        page = store.search(**kwargs)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "items": len(page["items"]),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    config.history_enabled = True
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.db"))
+        queued, written = fill(store, args.rows, args.seed)
+        print(f"{args.rows} entries queued in {queued:.2f}s, on disk after {written:.2f}s", file=sys.stderr)
+
+        oldest = args.rows // 50  # An id near the far end, like someone who kept paging
+        queries = {
+            "newest_page": dict(),
+            "deep_page": dict(before=oldest),
+            "search_common": dict(q="meeting"),
+            "search_common_deep": dict(q="meeting", before=oldest),
+            "search_two_words": dict(q="budget dead"),
+            "search_no_match": dict(q="zebra"),
+        }
+        results = {name: time_query(store, args.repeat, **kwargs) for name, kwargs in queries.items()}
+        for name, result in results.items():
+            print(f"{result['p50_ms']:9.3f} ms p50  {result['max_ms']:9.3f} ms max  {name}", file=sys.stderr)
+        db_mb = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 1024**2
+        print(f"Database size: {db_mb:.1f} MB", file=sys.stderr)
+
+    output = json.dumps({
+        "rows": args.rows,
+        "append_us": round(queued / args.rows * 1e6, 2),
+        "rows_per_second_written": round(args.rows / written),
+        "db_mb": round(db_mb, 1),
+        "queries": results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
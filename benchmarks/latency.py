@@ -0,0 +1,270 @@
+"""End-to-end dictation latency benchmark.
+
+Replays synthetic or recorded audio through the real AudioRecorder ->
+Transcriber -> TextFormatter -> paste path, with the microphone, keyboard
+and formatter backend replaced by local fakes, and times every stage.
+
+    python -m benchmarks.latency --engine stub --output bench.json
+    python -m benchmarks.latency --engine faster-whisper --audio clip.wav --repeat 5
+
+Run it from the repository root.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import types
+from dataclasses import asdict
+
+import numpy as np
+
+from benchmarks import fakes
+
+fakes.install()
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+from config import config  # noqa: E402
+import core.transcriber as transcriber_module  # noqa: E402
+from core.audio_recorder import AudioRecorder  # noqa: E402
+from core.formatter import text_formatter  # noqa: E402
+from core.recording_archive import RecordingArchive  # noqa: E402
+from core.model_manager import model_manager  # noqa: E402
+from core.streaming import StreamingSession  # noqa: E402
+from core.transcriber import transcriber  # noqa: E402
+from core.vad import trim_silence  # noqa: E402
+
+FS = 16000
+STAGES = ["finalize", "vad", "model_load", "decode", "format", "paste"]
+
+
+def synthetic_clip(seconds, seed=0):
+    # Voiced-speech-like signal: a harmonic stack at a wandering pitch,
+    # amplitude modulated at syllable rate, with half a second of room noise
+    # before and after so the VAD has something to trim
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * FS)) / FS
+    pitch = 140 + 20 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / FS
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    speech = 0.2 * voice * syllables
+    pad = rng.normal(0, 0.001, int(0.5 * FS))
+    return np.concatenate([pad, speech, pad]).astype(np.float32)
+
+
+def load_clip(path):
+    import scipy.io.wavfile as wav
+    from scipy.signal import resample_poly
+
+    rate, data = wav.read(path)
+    if data.dtype.kind == "i":
+        data = data.astype(np.float32) / np.iinfo(data.dtype).max
+    data = data.astype(np.float32)
+    if data.ndim > 1:
+        data = data.mean(axis=1)
+    if rate != FS:
+        data = resample_poly(data, FS, rate).astype(np.float32)
+    return data
+
+
+def use_stub_engine(load_seconds, rtf):
+    fakes.StubWhisperModel.load_seconds = load_seconds
+    fakes.StubWhisperModel.rtf = rtf
+    transcriber_module.WhisperModel = fakes.StubWhisperModel
+    transcriber_module.BatchedInferencePipeline = None
+    model_manager.get_model_path = lambda model_size=None: "stub"
+
+
+def use_fake_formatter(backend, latency):
+    server = fakes.FakeFormatterServer(latency)
+    config.formatter_backend = backend
+    config.gemini_base_url = server.gemini_url
+    config.gemini_api_key = "benchmark"
+    config.openai_base_url = server.openai_url
+    text_formatter.configure()
+    return server
+
+
+def disable_formatter():
+    config.formatter_backend = "gemini"
+    config.gemini_api_key = ""
+    text_formatter.configure()
+
+
+def ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def run_once(recorder, paste, audio, mode, cold):
+    source = fakes.fake_sounddevice.source
+    stages = {}
+
+    if cold:
+        transcriber.unload_model()
+
+    source.play(audio)
+    recorder.start()
+    session = None
+    if mode == "streaming":
+        session = StreamingSession(recorder.buffer)
+        recorder.stream_sink = session.feed
+    source.done.wait()
+
+    # Everything from here on is what the user waits for after the hotkey
+    t = time.perf_counter()
+    captured = recorder.stop()
+    recorder.stream_sink = None
+    stages["finalize"] = time.perf_counter() - t
+
+    # Only happens with save_recordings on. Queueing is on the dictation
+    # path, encoding runs on the archive's thread, so both are reported but
+    # neither is counted in the total.
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = RecordingArchive(tmp)
+        t = time.perf_counter()
+        name = archive.submit(captured, recorder.fs)
+        archive_submit = time.perf_counter() - t
+        archive.flush()
+        archive_encode = time.perf_counter() - t
+        archive_bytes = archive.index[name]["bytes"]
+
+    t = time.perf_counter()
+    vad = trim_silence(captured, recorder.fs)
+    stages["vad"] = time.perf_counter() - t
+
+    # Like main.py, streaming skips load_model(): the session already has the
+    # model, and load_model() would wait on the transcriber lock while the
+    # last chunk decodes, reporting that decode as model_load
+    t = time.perf_counter()
+    if not session:
+        transcriber.load_model()
+    stages["model_load"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    if session:
+        text = session.finish()
+    else:
+        text = transcriber.transcribe(vad.audio) if vad.has_speech else ""
+    stages["decode"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    formatted = text_formatter.format_text(text) if text else text
+    stages["format"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    if formatted:
+        paste(formatted)
+    stages["paste"] = time.perf_counter() - t
+
+    return {
+        "audio_seconds": round(len(captured) / FS, 3),
+        "speech_seconds": round(vad.speech_seconds, 3),
+        "decoding_profile": transcriber.last_profile,
+        "model": transcriber.current_model_size,
+        "stages_ms": {name: ms(stages[name]) for name in STAGES},
+        "archive_submit_ms": ms(archive_submit),
+        "archive_encode_ms": ms(archive_encode),
+        "archive_kb": round(archive_bytes / 1024, 1),
+        "total_ms": ms(sum(stages.values())),
+        "text": formatted,
+    }
+
+
+def summarize(runs):
+    summary = {}
+    for name in STAGES + ["total"]:
+        values = np.array([r["total_ms"] if name == "total" else r["stages_ms"][name] for r in runs])
+        summary[name] = {
+            "mean_ms": round(float(values.mean()), 3),
+            "p50_ms": round(float(np.percentile(values, 50)), 3),
+            "p95_ms": round(float(np.percentile(values, 95)), 3),
+            "max_ms": round(float(values.max()), 3),
+        }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", choices=["stub", "faster-whisper"], default="stub")
+    parser.add_argument("--stub-rtf", type=float, default=0.05, help="Stub decode seconds per audio second")
+    parser.add_argument("--stub-load", type=float, default=0.5, help="Stub model load seconds")
+    parser.add_argument("--synthetic", default="2,10,30", help="Comma separated synthetic clip lengths in seconds")
+    parser.add_argument("--audio", nargs="*", default=[], help="WAV files to replay")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mode", choices=["batch", "streaming"], default="batch")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="Microphone playback speed, 1.0 is real time, 0 as fast as possible")
+    parser.add_argument("--cold", action="store_true", help="Unload the model before every run")
+    parser.add_argument("--formatter", choices=["gemini", "openai", "off"], default="gemini",
+                        help="Formatter backend, served by a local fake")
+    parser.add_argument("--openai-stream", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--formatter-latency", type=float, default=0.3, help="Fake backend response time in seconds")
+    parser.add_argument("--format-budget-ms", type=int, default=config.format_budget_ms,
+                        help="Paste the local formatter's result when the backend is slower than this, 0 to always wait")
+    parser.add_argument("--format-cache", action="store_true",
+                        help="Keep the formatter cache on, repeats of a clip then skip the backend")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.mode == "streaming" and not args.speed:
+        parser.error("--mode streaming needs --speed > 0 so chunks are cut while recording")
+
+    if args.engine == "stub":
+        use_stub_engine(args.stub_load, args.stub_rtf)
+    config.openai_stream = args.openai_stream
+    if args.formatter == "off":
+        formatter_server = None
+        disable_formatter()
+    else:
+        formatter_server = use_fake_formatter(args.formatter, args.formatter_latency)
+    config.transcription_mode = args.mode
+    config.format_cache_enabled = args.format_cache
+    config.format_budget_ms = args.format_budget_ms
+    config.unload_model = False
+    config.model_idle_timeout_minutes = 0
+    fakes.fake_sounddevice.source.speed = args.speed
+
+    clips = [(f"synthetic-{s}s", synthetic_clip(float(s))) for s in args.synthetic.split(",") if s]
+    clips += [(os.path.basename(path), load_clip(path)) for path in args.audio]
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from main import ApplicationController
+    paste_target = types.SimpleNamespace(app=app)
+
+    def paste(text):
+        ApplicationController.handle_paste_request(paste_target, text)
+
+    recorder = AudioRecorder()
+    results = []
+    for name, audio in clips:
+        runs = [run_once(recorder, paste, audio, args.mode, args.cold) for _ in range(args.repeat)]
+        results.append({"clip": name, "runs": runs, "summary": summarize(runs)})
+        print(f"{name}: total p50 {results[-1]['summary']['total']['p50_ms']:.1f} ms", file=sys.stderr)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "engine": args.engine,
+        "args": vars(args),
+        "config": {k: v for k, v in asdict(config).items() if "api_key" not in k},
+        "clips": results,
+        # One connection for all calls means the client is reusing it
+        "formatter": {"calls": formatter_server.calls, "connections": len(formatter_server.connections)} if formatter_server else None,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
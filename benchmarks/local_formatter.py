@@ -0,0 +1,79 @@
+"""Per-utterance cost of the local rule-based formatter.
+
+    python -m benchmarks.local_formatter
+    python -m benchmarks.local_formatter --repeat 20000 --output local_fmt.json
+
+Run it from the repository root.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from core.local_formatter import local_formatter
+
+# Shaped like Whisper output: mostly short, lower case commands and replies,
+# a few longer sentences with numbers and dictated lists
+UTTERANCES = [
+    "ok",
+    "thanks",
+    "sounds good to me",
+    "what time is the meeting tomorrow",
+    "i'll be there in twenty minutes",
+    "can you send me the report",
+    "best regards, john",
+    "it went up five percent last quarter",
+    "we need two hundred and fifty chairs for the event",
+    "the budget is one million two hundred thousand dollars",
+    "call me back when you get a chance , i'm in the office until five",
+    "Shopping list: first, eggs, second, milk, and finally, bread.",
+    "Agenda for today. Number one, the roadmap. Number two, hiring. Number three, the offsite.",
+    "at first i thought it was fine but then i realized the numbers were off by about thirty percent",
+    "i think we should ship it on monday and then fix the remaining issues in the next release",
+]
+
+
+def bench(text, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        local_formatter.format_text(text)
+        samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    return {
+        "words": len(text.split()),
+        "mean_us": round(statistics.fmean(samples) / 1000, 2),
+        "p50_us": round(samples[len(samples) // 2] / 1000, 2),
+        "p99_us": round(samples[int(len(samples) * 0.99)] / 1000, 2),
+        "output": local_formatter.format_text(text),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5000)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # Warm-up, so regex caches and the like are not in the first sample
+    for text in UTTERANCES:
+        local_formatter.format_text(text)
+
+    results = {text: bench(text, args.repeat) for text in UTTERANCES}
+    for text, result in results.items():
+        print(f"{result['p50_us']:8.2f} us p50  {result['p99_us']:8.2f} us p99  {text[:60]}", file=sys.stderr)
+    overall = statistics.fmean(r["mean_us"] for r in results.values())
+    print(f"Mean over all utterances: {overall:.2f} us", file=sys.stderr)
+
+    output = json.dumps({"repeat": args.repeat, "mean_us": round(overall, 2), "utterances": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
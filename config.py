@@ -1,6 +1,6 @@
 import json
 import os
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 
 CONFIG_FILE = "config.json"
 
@@ -9,14 +9,64 @@ class AppConfig:
     model_size: str = "distil-large-v3"
     device: str = "auto"  # 'auto', 'cuda', 'cpu'
     compute_type: str = "float16" # 'float16', 'int8_float16', 'int8'
+    tuned_profiles: dict = field(default_factory=dict) # "model|device" -> settings saved by core.autotune
     hotkey: str = "ctrl+shift+space"
+    cancel_hotkey: str = "ctrl+shift+backspace" # Cancels queued and running transcriptions, empty to disable
+    cancel_on_new_recording: bool = False # Starting a new recording drops the ones still being transcribed
+    max_queued_jobs: int = 3 # Recordings allowed to wait for the model, further ones are rejected
     language: str = "en"
+    decoding_profile: str = "auto" # 'auto', 'fast', 'balanced', 'accurate'
+    latency_target_seconds: float = 1.5 # Auto profile keeps the estimated decode time under this
+    batched_min_seconds: float = 60.0 # Recordings at least this long use batched inference, 0 to disable
+    batch_size: int = 8 # Speech segments decoded together in batched mode
+    model_routing: bool = False # Pick the model by how much speech was recorded instead of always model_size
+    routing_short_model: str = "distil-small.en" # Used for utterances up to routing_short_max_seconds
+    routing_short_max_seconds: float = 5.0
+    routing_long_model: str = "large-v3" # Used from routing_long_min_seconds on, 0 to disable
+    routing_long_min_seconds: float = 60.0
     input_device_index: int = -1 # -1 for default
+    keep_mic_open: bool = False # Keep the input stream running so recording starts instantly
+    preroll_ms: int = 300 # Audio from before the hotkey press included when keep_mic_open is on
     save_recordings: bool = False
+    recording_format: str = "flac" # 'flac' (lossless), 'opus' (smallest) or 'wav'
+    recordings_max_mb: int = 1024 # Oldest saved recordings are deleted past this, 0 for no limit
+    recordings_max_days: float = 30 # Saved recordings older than this are deleted, 0 keeps them
+    history_enabled: bool = True # Keep every dictation in history/history.db, searchable from the dashboard
+    history_batch_size: int = 64 # Most entries the background writer inserts per transaction
+    vad_enabled: bool = True # Trim silence and skip decoding when nothing was said
+    vad_threshold_db: float = -50.0 # Frames quieter than this (dBFS) are never speech
+    vad_min_speech_ms: int = 150 # Less voiced audio than this counts as no speech
+    vad_padding_ms: int = 210 # Audio kept around the detected speech
+    max_recording_seconds: int = 600 # Audio past this is dropped, 0 for no limit
     unload_model: bool = False
+    preload_model: bool = True # Load and warm up the model in the background at startup
+    model_idle_timeout_minutes: float = 0 # Unload after this long without use, 0 keeps it loaded
+    model_cache_ram_mb: int = 4096 # CPU models kept loaded at once, least recently used are unloaded past this
+    model_cache_vram_mb: int = 4096 # Same for GPU models. 0 keeps only the active model
+    formatter_backend: str = "gemini" # 'gemini', 'openai' (any OpenAI-compatible server: llama.cpp, vLLM, Ollama)
     gemini_api_key: str = ""
     gemini_model: str = "gemini-1.5-flash"
+    gemini_base_url: str = "https://generativelanguage.googleapis.com/v1beta"
+    openai_base_url: str = "http://127.0.0.1:8080/v1" # Ollama is on :11434/v1, vLLM on :8000/v1
+    openai_api_key: str = "" # Most local servers don't need one
+    openai_model: str = "" # Empty lets a single-model server (llama.cpp) use its own, Ollama and vLLM need a name
+    openai_stream: bool = True # Read the answer token by token, the read timeout then applies between tokens
+    formatter_connect_timeout: float = 3.0 # Seconds to establish the connection
+    formatter_read_timeout: float = 10.0 # Seconds to wait for the formatted text, the local result is pasted after this
+    formatter_retries: int = 1 # Extra attempts after a connection failure, 429 or 5xx
+    format_budget_ms: int = 800 # Paste the local formatter's result if the backend takes longer than this. 0 always waits
+    local_format_max_words: int = 6 # Transcripts up to this many words are formatted locally, not by the backend. 0 to disable
+    format_cache_enabled: bool = True # Reuse formatted text for transcripts seen before, stored in cache/
+    format_cache_memory_entries: int = 256
+    format_cache_max_mb: int = 20 # Least recently used entries are dropped from disk past this
     translate_to_english: bool = False
+    api_max_concurrent_transcriptions: int = 2 # Uploads to /api/transcribe handled at once, others get 429
+    api_max_upload_mb: int = 100
+    transcription_mode: str = "batch" # 'batch', 'streaming'
+    stream_min_chunk_seconds: float = 4.0 # Don't cut a streaming chunk before this much audio
+    stream_max_chunk_seconds: float = 20.0 # Force a cut even if the speaker never pauses
+    stream_pause_ms: int = 500 # Silence needed to close a chunk
+    stream_silence_rms: float = 0.01 # Blocks below this level count as silence
     
     @classmethod
     def load(cls):
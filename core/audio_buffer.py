@@ -0,0 +1,75 @@
+import numpy as np
+
+
+class AudioBuffer:
+    # Mono float32 capture buffer built from preallocated fixed-size chunks.
+    # Appends write straight into the current chunk and a new chunk is only
+    # allocated when it fills up, so nothing is ever reallocated or moved.
+    # That keeps appends O(1) and lets readers hold on to views while the
+    # recording keeps growing.
+    def __init__(self, fs=16000, chunk_seconds=60.0, max_seconds=0):
+        self.fs = fs
+        self.chunk_size = max(1, int(fs * chunk_seconds))
+        self.max_samples = int(fs * max_seconds) if max_seconds else None
+        self.chunks = [np.empty(self.chunk_size, dtype=np.float32)]
+        self.length = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def duration(self):
+        return self.length / self.fs
+
+    def write(self, data):
+        # `data` is either 1-D mono or a PortAudio style (frames, channels)
+        # block. Multi-channel input is mixed down directly into the buffer.
+        n = len(data)
+        if self.max_samples is not None:
+            room = max(0, self.max_samples - self.length)
+            if n > room:
+                self.dropped += n - room
+                n = room
+
+        written = 0
+        while written < n:
+            index, offset = divmod(self.length, self.chunk_size)
+            if index == len(self.chunks):
+                self.chunks.append(np.empty(self.chunk_size, dtype=np.float32))
+            take = min(n - written, self.chunk_size - offset)
+            dest = self.chunks[index][offset:offset + take]
+            src = data[written:written + take]
+
+            if src.ndim == 1:
+                dest[:] = src
+            elif src.shape[1] == 1:
+                dest[:] = src[:, 0]
+            else:
+                np.mean(src, axis=1, out=dest)
+
+            written += take
+            self.length += take
+        return n
+
+    def slice(self, start, end):
+        # Zero-copy when the range sits inside one chunk, a copy otherwise
+        start = max(0, start)
+        end = min(end, self.length)
+        if end <= start:
+            return np.empty(0, dtype=np.float32)
+
+        first, first_offset = divmod(start, self.chunk_size)
+        last, last_offset = divmod(end - 1, self.chunk_size)
+        if first == last:
+            return self.chunks[first][first_offset:last_offset + 1]
+
+        parts = [self.chunks[first][first_offset:]]
+        parts.extend(self.chunks[first + 1:last])
+        parts.append(self.chunks[last][:last_offset + 1])
+        return np.concatenate(parts)
+
+    def view(self):
+        # The whole recording. Recordings shorter than one chunk (the common
+        # case) come back as a view without copying anything.
+        return self.slice(0, self.length)
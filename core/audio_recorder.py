@@ -1,11 +1,9 @@
 import sounddevice as sd
 import numpy as np
-import scipy.io.wavfile as wav
-import tempfile
-import os
 import threading
 import time
 from config import config
+from core.audio_buffer import AudioBuffer
 
 from PyQt6.QtCore import QObject, pyqtSignal
 
@@ -15,21 +13,44 @@ class AudioRecorder(QObject):
     def __init__(self):
         super().__init__()
         self.recording = False
-        self.frames = []
         self.fs = 16000  # Sample rate for Whisper
+        self.buffer = AudioBuffer(self.fs)
         self.thread = None
-        self.temp_file = None
+        self.stream_sink = None  # Optional callable(end, rms) fed while recording
+        self.lock = threading.Lock()
+
+        # Resolved (device, channels), cached until the selected device changes
+        self.device_index = None
+        self.device_settings = None
+
+        # Always-open stream (keep_mic_open) and the pre-roll ring it fills while idle
+        self.stream = None
+        self.preroll = np.zeros(0, dtype=np.float32)
+        self.preroll_pos = 0
+        self.preroll_filled = 0
 
     def start(self):
         if self.recording:
             return
-        self.recording = True
-        self.frames = []
-        self.thread = threading.Thread(target=self._record)
-        self.thread.start()
+        if config.keep_mic_open and self.stream is None:
+            self.open_stream()
+
+        with self.lock:
+            self.buffer = AudioBuffer(self.fs, max_seconds=config.max_recording_seconds)
+            if self.stream is not None:
+                # The stream is already running, capture starts with the audio from just before the press
+                self._drain_preroll()
+            self.recording = True
+
+        if self.stream is None:
+            self.thread = threading.Thread(target=self._record)
+            self.thread.start()
         print("Recording started...")
 
-    def _record(self):
+    def _get_device_settings(self):
+        if self.device_settings and self.device_index == config.input_device_index:
+            return self.device_settings
+
         device = config.input_device_index if config.input_device_index != -1 else None
         
         # Validate and get device info
@@ -60,6 +81,13 @@ class AudioRecorder(QObject):
             print(f"Warning: Could not query device info: {e}. Using system default with 1 channel.")
             device = None
             channels = 1
+
+        self.device_index = config.input_device_index
+        self.device_settings = (device, channels)
+        return self.device_settings
+
+    def _record(self):
+        device, channels = self._get_device_settings()
         
         try:
             with sd.InputStream(samplerate=self.fs, device=device, channels=channels, dtype='float32', callback=self._callback):
@@ -69,56 +97,116 @@ class AudioRecorder(QObject):
             print(f"Error during recording: {e}")
             self.recording = False
 
+    def open_stream(self):
+        # Keeps the microphone open between recordings so starting is instant
+        if self.stream is not None:
+            return
+        device, channels = self._get_device_settings()
+        self.preroll = np.zeros(int(self.fs * config.preroll_ms / 1000), dtype=np.float32)
+        self.preroll_pos = 0
+        self.preroll_filled = 0
+        try:
+            stream = sd.InputStream(samplerate=self.fs, device=device, channels=channels, dtype='float32', callback=self._callback)
+            stream.start()
+            self.stream = stream
+            print(f"Microphone kept open with {config.preroll_ms}ms pre-roll")
+        except Exception as e:
+            # Fall back to opening the device per recording
+            print(f"Error opening persistent input stream: {e}")
+
+    def close_stream(self):
+        if self.stream is None:
+            return
+        stream = self.stream
+        self.stream = None
+        try:
+            stream.stop()
+            stream.close()
+        except Exception as e:
+            print(f"Error closing input stream: {e}")
+
+    def reconfigure(self):
+        # Called after settings are saved, on the Qt thread like start() and
+        # stop() (see ApplicationController.request_reconfigure_recorder).
+        # Picks up a new device or keep_mic_open value, the open stream is
+        # only recycled when something changed.
+        device_changed = self.device_index != config.input_device_index
+        if device_changed:
+            self.device_settings = None
+        if self.recording:
+            return
+        if self.stream is not None and (device_changed or not config.keep_mic_open):
+            self.close_stream()
+        if config.keep_mic_open:
+            self.open_stream()
+
+    def _write_preroll(self, indata):
+        size = len(self.preroll)
+        if size == 0:
+            return
+        mono = indata[:, 0] if indata.shape[1] == 1 else np.mean(indata, axis=1)
+        if len(mono) >= size:
+            self.preroll[:] = mono[-size:]
+            self.preroll_pos = 0
+            self.preroll_filled = size
+            return
+        first = min(len(mono), size - self.preroll_pos)
+        self.preroll[self.preroll_pos:self.preroll_pos + first] = mono[:first]
+        self.preroll[:len(mono) - first] = mono[first:]
+        self.preroll_pos = (self.preroll_pos + len(mono)) % size
+        self.preroll_filled = min(size, self.preroll_filled + len(mono))
+
+    def _drain_preroll(self):
+        if self.preroll_filled == len(self.preroll):
+            self.buffer.write(self.preroll[self.preroll_pos:])
+            self.buffer.write(self.preroll[:self.preroll_pos])
+        else:
+            self.buffer.write(self.preroll[:self.preroll_filled])
+        self.preroll_pos = 0
+        self.preroll_filled = 0
+
     def _callback(self, indata, frames, time, status):
         if status:
             print(status)
         
-        # Convert stereo to mono if needed (Whisper expects mono)
-        if indata.shape[1] > 1:
-            # Average all channels to get mono
-            mono_data = np.mean(indata, axis=1, keepdims=True)
-        else:
-            mono_data = indata
-        
-        self.frames.append(mono_data.copy())
+        with self.lock:
+            if not self.recording:
+                self._write_preroll(indata)
+                return
+
+            # Mixes down to mono (Whisper expects mono) while copying into the buffer
+            start = len(self.buffer)
+            written = self.buffer.write(indata)
+            if written < frames and self.buffer.dropped == frames - written:
+                print(f"Reached the {config.max_recording_seconds}s recording limit, ignoring further audio.")
+            end = len(self.buffer)
+            if end == start:
+                return
+            block = self.buffer.slice(start, end)
+            rms = float(np.sqrt(np.mean(block**2)))
+
+            if self.stream_sink:
+                self.stream_sink(end, rms)
         
-        # Calculate RMS for visualizer
-        rms = np.sqrt(np.mean(mono_data**2))
-        self.level_updated.emit(float(rms))
+        # RMS for visualizer
+        self.level_updated.emit(rms)
 
     def stop(self):
         if not self.recording:
             return None
         
         print("Stopping recording...")
-        self.recording = False
+        with self.lock:
+            self.recording = False
         if self.thread:
             self.thread.join()
+            self.thread = None
         
-        if not self.frames:
+        if not len(self.buffer):
             print("No audio recorded.")
             return None
 
-        # Concatenate all frames
-        recording = np.concatenate(self.frames, axis=0)
-        
-        # Save to temp file
-        # We use a named temp file but close it so other processes can read it if needed, 
-        # though here we just pass the path.
-        fd, path = tempfile.mkstemp(suffix=".wav")
-        os.close(fd)
-        
-        # Convert to 16-bit PCM for compatibility
-        data_int16 = (recording * 32767).astype(np.int16)
-        wav.write(path, self.fs, data_int16)
-        
-        self.temp_file = path
-        print(f"Audio saved to {path}")
-        return path
-
-    def cleanup(self):
-        if self.temp_file and os.path.exists(self.temp_file):
-            try:
-                os.remove(self.temp_file)
-            except:
-                pass
+        # 1-D float32 view of the captured audio, which Whisper consumes directly
+        recording = self.buffer.view()
+        print(f"Captured {self.buffer.duration:.2f}s of audio")
+        return recording
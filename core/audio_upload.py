@@ -0,0 +1,226 @@
+import struct
+import tempfile
+from math import gcd
+
+import numpy as np
+from config import config
+from core.audio_buffer import AudioBuffer
+
+FS = 16000
+
+# Everything before the WAV data chunk is buffered, real headers are a few
+# hundred bytes even with metadata
+MAX_WAV_HEADER_BYTES = 1024 * 1024
+
+WAV_TYPES = {"audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave"}
+FLAC_TYPES = {"audio/flac", "audio/x-flac"}
+PCM_TYPES = {"audio/l16", "audio/pcm", "application/octet-stream"}
+
+# numpy dtypes for raw PCM sample formats
+PCM_FORMATS = {
+    "s16le": "<i2",
+    "s16be": ">i2",
+    "s32le": "<i4",
+    "f32le": "<f4",
+}
+
+
+class UnsupportedAudio(ValueError):
+    pass
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class InvalidAudio(ValueError):
+    # Claims a supported format but the bytes or parameters don't add up
+    pass
+
+
+def _check_size(size):
+    if size > config.api_max_upload_mb * 1024 * 1024:
+        raise UploadTooLarge(f"Upload larger than {config.api_max_upload_mb} MB")
+
+
+def _to_float32(samples):
+    if samples.dtype.kind == "f":
+        return samples.astype(np.float32, copy=False)
+    return samples.astype(np.float32) / float(np.iinfo(samples.dtype).max + 1)
+
+
+def resample(audio, rate):
+    if rate == FS:
+        return audio
+    from scipy.signal import resample_poly
+    g = gcd(FS, rate)
+    return resample_poly(audio, FS // g, rate // g).astype(np.float32)
+
+
+class PcmDecoder:
+    # Interleaved PCM fed in arbitrary byte chunks. Whole frames are converted
+    # and mixed down into a float32 buffer as they arrive, partial frames wait
+    # for the next chunk.
+    def __init__(self, sample_format="s16le", rate=FS, channels=1):
+        if sample_format not in PCM_FORMATS:
+            raise UnsupportedAudio(f"Unsupported PCM format '{sample_format}'")
+        if rate <= 0 or channels < 1:
+            raise InvalidAudio(f"Invalid sample rate {rate} or channel count {channels}")
+        self.dtype = np.dtype(PCM_FORMATS[sample_format])
+        self.rate = rate
+        self.channels = channels
+        self.pending = b""
+        self.size = 0
+        self.buffer = AudioBuffer(rate, max_seconds=config.max_recording_seconds)
+
+    def feed(self, data):
+        self.size += len(data)
+        _check_size(self.size)
+        data = self.pending + data
+        frame_bytes = self.dtype.itemsize * self.channels
+        usable = len(data) - len(data) % frame_bytes
+        self.pending = data[usable:]
+        if not usable:
+            return
+        samples = np.frombuffer(data[:usable], dtype=self.dtype).reshape(-1, self.channels)
+        self.buffer.write(_to_float32(samples))
+        if self.buffer.dropped:
+            raise UploadTooLarge(f"Audio longer than {config.max_recording_seconds}s")
+
+    def finish(self):
+        return resample(self.buffer.view(), self.rate)
+
+
+class WavDecoder:
+    # Parses the RIFF header incrementally, then streams the data chunk
+    # through a PcmDecoder
+    def __init__(self):
+        self.header = bytearray()
+        self.pos = 12  # Start of the next chunk to parse
+        self.fmt = None
+        self.size = 0
+        self.pcm = None
+        self.remaining = None  # Bytes left in the data chunk, None if the size is unknown
+
+    def feed(self, data):
+        self.size += len(data)
+        _check_size(self.size)
+        if self.pcm:
+            self._feed_data(data)
+            return
+        self.header += data
+        if len(self.header) > MAX_WAV_HEADER_BYTES:
+            raise UnsupportedAudio(f"WAV header larger than {MAX_WAV_HEADER_BYTES // 1024} KB")
+        self._parse_header()
+
+    def _parse_header(self):
+        h = self.header
+        if len(h) < 12:
+            return
+        if h[:4] != b"RIFF" or h[8:12] != b"WAVE":
+            raise InvalidAudio("Not a RIFF/WAVE file")
+
+        # Resumes where the last feed stopped, chunks already seen aren't parsed again
+        pos = self.pos
+        while pos + 8 <= len(h):
+            chunk_id = h[pos:pos + 4]
+            size = struct.unpack("<I", h[pos + 4:pos + 8])[0]
+            body = pos + 8
+            if chunk_id == b"data":
+                if self.fmt is None:
+                    raise InvalidAudio("WAV data chunk before fmt chunk")
+                self.pcm = self._make_pcm(*self.fmt)
+                # Streaming writers leave the size at 0 or 0xFFFFFFFF
+                self.remaining = size if size not in (0, 0xFFFFFFFF) else None
+                self.header = bytearray()
+                self._feed_data(bytes(h[body:]))
+                return
+            if body + size > len(h):
+                break  # Need more bytes
+            if chunk_id == b"fmt ":
+                self.fmt = self._read_fmt(bytes(h[body:body + size]))
+            pos = body + size + (size & 1)  # Chunks are word aligned
+        self.pos = pos
+
+    def _feed_data(self, data):
+        # Anything after the data chunk (LIST, id3...) is not audio
+        if self.remaining is not None:
+            data = data[:self.remaining]
+            self.remaining -= len(data)
+        if data:
+            self.pcm.feed(data)
+
+    @staticmethod
+    def _read_fmt(body):
+        if len(body) < 16:
+            raise InvalidAudio("WAV fmt chunk too short")
+        tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+        if tag == 0xFFFE and len(body) >= 26:
+            tag = struct.unpack("<H", body[24:26])[0]  # WAVE_FORMAT_EXTENSIBLE sub-format
+        if rate <= 0 or channels < 1:
+            raise InvalidAudio(f"Invalid WAV sample rate {rate} or channel count {channels}")
+        return tag, channels, rate, bits
+
+    @staticmethod
+    def _make_pcm(tag, channels, rate, bits):
+        if tag == 1 and bits == 16:
+            return PcmDecoder("s16le", rate, channels)
+        if tag == 1 and bits == 32:
+            return PcmDecoder("s32le", rate, channels)
+        if tag == 3 and bits == 32:
+            return PcmDecoder("f32le", rate, channels)
+        raise UnsupportedAudio(f"Unsupported WAV encoding (format {tag}, {bits} bit)")
+
+    def finish(self):
+        if not self.pcm:
+            # Ended before the data chunk: truncated, or too short to be a WAV at all
+            if len(self.header) < 12 or self.header[:4] != b"RIFF" or self.header[8:12] != b"WAVE":
+                raise InvalidAudio("Not a RIFF/WAVE file")
+            raise InvalidAudio("WAV file has no data chunk")
+        return self.pcm.finish()
+
+
+class SpooledDecoder:
+    # Compressed formats (FLAC) need a real decoder. The upload is spooled to
+    # memory, or disk past 4 MB, and decoded by PyAV once complete.
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024)
+        self.size = 0
+
+    def feed(self, data):
+        self.size += len(data)
+        _check_size(self.size)
+        self.file.write(data)
+
+    def finish(self):
+        from faster_whisper import decode_audio
+        self.file.seek(0)
+        try:
+            return decode_audio(self.file, sampling_rate=FS)
+        finally:
+            self.file.close()
+
+
+def decoder_for(content_type, sample_rate=FS, channels=1, sample_format="s16le"):
+    # content_type is the raw header value, e.g. "audio/L16;rate=8000;channels=2"
+    parts = [p.strip() for p in (content_type or "").split(";")]
+    mime = parts[0].lower()
+    params = dict(p.split("=", 1) for p in parts[1:] if "=" in p)
+
+    if mime in WAV_TYPES:
+        return WavDecoder()
+    if mime in FLAC_TYPES:
+        return SpooledDecoder()
+    if mime in PCM_TYPES:
+        if mime == "audio/l16":
+            # RFC 2586: big-endian, rate and channels in the media type
+            try:
+                sample_rate = int(params.get("rate", sample_rate))
+                channels = int(params.get("channels", channels))
+            except ValueError:
+                raise InvalidAudio(f"Invalid audio/L16 parameters in '{content_type}'")
+            sample_format = "s16be"
+        if sample_rate <= 0 or channels < 1:
+            raise InvalidAudio(f"sample_rate must be positive and channels at least 1, got {sample_rate} and {channels}")
+        return PcmDecoder(sample_format, sample_rate, channels)
+    raise UnsupportedAudio(f"Unsupported content type '{mime}'")
@@ -0,0 +1,147 @@
+"""Finds the fastest compute_type / cpu_threads for this host.
+
+    python -m core.autotune                   # configured model and device
+    python -m core.autotune --model small --runs 5
+    python -m core.autotune --clip recordings/recording_20250101_120000_000.flac
+
+The winner is saved to config.json under tuned_profiles and used by
+Transcriber.load_model from then on. Close the app first, it would
+overwrite config.json with its own copy on the next settings save.
+"""
+import argparse
+import gc
+import os
+import statistics
+import time
+
+import numpy as np
+import ctranslate2
+from faster_whisper import WhisperModel
+
+from config import config
+from core.model_manager import model_manager
+from core.transcriber import resolve_device, tuned_profile_key
+
+FS = 16000
+
+# In order of preference, ties go to the earlier entry
+CPU_COMPUTE_TYPES = ["int8", "int8_float32", "int8_bfloat16", "bfloat16", "float32"]
+CUDA_COMPUTE_TYPES = ["int8_float16", "float16", "int8", "bfloat16", "int8_bfloat16", "float32"]
+
+# Same options for every candidate so only the engine settings differ. Greedy,
+# no fallback and a token cap keep a bad hallucination from skewing one run.
+DECODE_OPTIONS = {
+    "beam_size": 1,
+    "temperature": 0.0,
+    "condition_on_previous_text": False,
+    "max_new_tokens": 96,
+}
+
+
+def reference_clip(seconds=8.0):
+    # Built-in deterministic clip: voiced, speech-like audio with syllable-rate
+    # amplitude modulation. Pass --clip with one of your own recordings to tune
+    # on real speech.
+    t = np.arange(int(seconds * FS)) / FS
+    pitch = 130 + 25 * np.sin(2 * np.pi * 0.25 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / FS
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * 3.5 * t), 0, None) ** 0.5
+    return (0.15 * voice * syllables).astype(np.float32)
+
+
+def load_clip(path):
+    from faster_whisper import decode_audio
+    return decode_audio(path, sampling_rate=FS)
+
+
+def candidates(device):
+    supported = ctranslate2.get_supported_compute_types(device)
+    preferred = CPU_COMPUTE_TYPES if device == "cpu" else CUDA_COMPUTE_TYPES
+    compute_types = [c for c in preferred if c in supported]
+
+    if device == "cpu":
+        cores = os.cpu_count() or 1
+        threads = sorted({max(1, cores // 4), max(1, cores // 2), cores})
+    else:
+        threads = [0]  # Irrelevant on GPU, let CTranslate2 pick
+    # num_workers isn't searched: Transcriber runs every decode under one lock
+    # from a single queue worker, so the app never decodes two clips at once
+    # and extra workers would only cost memory. It always loads with 1.
+    return [(c, t) for c in compute_types for t in threads]
+
+
+def _decode(model, audio):
+    segments, _ = model.transcribe(audio, **DECODE_OPTIONS)
+    for _ in segments:
+        pass
+
+
+def measure(model_path, device, compute_type, cpu_threads, audio, runs):
+    # Median latency of one clip decoded on its own, one after another, the
+    # same pattern as the app's transcription queue
+    model = WhisperModel(model_path, device=device, compute_type=compute_type,
+                         cpu_threads=cpu_threads, num_workers=1)
+    try:
+        _decode(model, audio)  # Warm-up
+        latencies = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            _decode(model, audio)
+            latencies.append(time.perf_counter() - start)
+        return statistics.median(latencies)
+    finally:
+        del model
+        gc.collect()
+
+
+def autotune(model_size, device, audio, runs):
+    model_path = model_manager.get_model_path(model_size)
+    results = []
+    for compute_type, cpu_threads in candidates(device):
+        label = f"{compute_type:<14} threads={cpu_threads:<3}"
+        try:
+            latency = measure(model_path, device, compute_type, cpu_threads, audio, runs)
+        except Exception as e:
+            print(f"  {label}  failed: {e}")
+            continue
+        print(f"  {label}  {latency * 1000:8.1f} ms")
+        results.append((latency, compute_type, cpu_threads))
+
+    if not results:
+        raise RuntimeError("No candidate setting could be loaded")
+
+    # min() keeps the first of equal latencies, which is the preferred candidate
+    latency, compute_type, cpu_threads = min(results, key=lambda r: r[0])
+    return {
+        "compute_type": compute_type,
+        "cpu_threads": cpu_threads,
+        "latency_ms": round(latency * 1000, 1),
+        "tuned_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=config.model_size)
+    parser.add_argument("--device", default=config.device, choices=["auto", "cpu", "cuda"])
+    parser.add_argument("--clip", help="Audio file to tune on instead of the built-in clip")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--dry-run", action="store_true", help="Print the result without saving it")
+    args = parser.parse_args(argv)
+
+    device = resolve_device(args.device)
+    audio = load_clip(args.clip) if args.clip else reference_clip()
+    print(f"Auto-tuning {args.model} on {device} with a {len(audio) / FS:.1f}s clip...")
+
+    best = autotune(args.model, device, audio, args.runs)
+    print(f"Fastest: {best}")
+
+    if not args.dry_run:
+        config.tuned_profiles[tuned_profile_key(args.model, device)] = best
+        config.save()
+        print("Saved to config.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from config import config
+
+# Decoding settings passed straight to WhisperModel.transcribe.
+# "accurate" matches faster-whisper's own defaults.
+PROFILES = {
+    "fast": {
+        "beam_size": 1,
+        "best_of": 1,
+        "temperature": [0.0],
+        "condition_on_previous_text": False,
+    },
+    "balanced": {
+        "beam_size": 3,
+        "best_of": 3,
+        "temperature": [0.0, 0.4, 0.8],
+        "condition_on_previous_text": False,
+    },
+    "accurate": {
+        "beam_size": 5,
+        "best_of": 5,
+        "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0],
+        "condition_on_previous_text": True,
+    },
+}
+
+# Most accurate first, auto mode takes the first one that fits the latency target
+AUTO_ORDER = ["accurate", "balanced", "fast"]
+
+# Rough decode cost relative to greedy, used to estimate the profiles that
+# haven't been measured on the current model yet
+RELATIVE_COST = {"fast": 1.0, "balanced": 1.7, "accurate": 2.5}
+
+# Weight of the newest measurement in the running real-time factor
+RTF_SMOOTHING = 0.3
+
+
+class ProfileSelector:
+    def __init__(self):
+        self.rtf = {}  # (model_key, profile) -> smoothed decode seconds per audio second
+
+    def record(self, model_key, profile, audio_seconds, decode_seconds):
+        if not audio_seconds:
+            return
+        rtf = decode_seconds / audio_seconds
+        key = (model_key, profile)
+        previous = self.rtf.get(key)
+        self.rtf[key] = rtf if previous is None else previous + RTF_SMOOTHING * (rtf - previous)
+
+    def estimate_rtf(self, model_key, profile):
+        measured = self.rtf.get((model_key, profile))
+        if measured is not None:
+            return measured
+        # Scale from whichever profile we did measure
+        for other in AUTO_ORDER:
+            other_rtf = self.rtf.get((model_key, other))
+            if other_rtf is not None:
+                return other_rtf * RELATIVE_COST[profile] / RELATIVE_COST[other]
+        return None
+
+    def choose(self, model_key, audio_seconds):
+        if config.decoding_profile != "auto":
+            return config.decoding_profile if config.decoding_profile in PROFILES else "accurate"
+
+        if not audio_seconds:
+            return "balanced"
+
+        for profile in AUTO_ORDER:
+            rtf = self.estimate_rtf(model_key, profile)
+            if rtf is None:
+                # Nothing measured on this model yet, start in the middle
+                return "balanced"
+            if rtf * audio_seconds <= config.latency_target_seconds:
+                return profile
+        return "fast"
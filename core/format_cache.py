@@ -0,0 +1,119 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config import config
+from core.metrics import metrics
+
+
+def cache_key(text, model, prompt_version):
+    # Content addressed: same transcript, model and prompt give the same key
+    return hashlib.sha256(f"{model}\0{prompt_version}\0{text.strip()}".encode()).hexdigest()
+
+
+class FormatCache:
+    # Formatted outputs by cache_key. A small in-memory LRU sits in front of
+    # a SQLite file, so repeated phrases (sign-offs, addresses, stock replies)
+    # skip the network even after a restart. The file is trimmed by least
+    # recent use once it grows past format_cache_max_mb.
+    def __init__(self, path=None):
+        self.path = path or os.path.join(os.getcwd(), "cache", "format_cache.db")
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.db = None
+        self.disk_bytes = 0
+        self.hits = 0
+        self.lookups = 0
+
+    def _open(self):
+        # Opened on first use, off the startup path
+        if self.db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS formatted ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS formatted_last_used ON formatted (last_used)")
+            self.disk_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM formatted").fetchone()[0]
+        return self.db
+
+    def get(self, key):
+        if not config.format_cache_enabled:
+            return None
+        with self.lock:
+            self.lookups += 1
+            value = self.memory.get(key)
+            if value is not None:
+                self.memory.move_to_end(key)
+                return self._hit("memory", value)
+
+            try:
+                db = self._open()
+                row = db.execute("SELECT value FROM formatted WHERE key = ?", (key,)).fetchone()
+                if row:
+                    db.execute("UPDATE formatted SET last_used = ? WHERE key = ?", (time.time(), key))
+                    db.commit()
+                    self._remember(key, row[0])
+                    return self._hit("disk", row[0])
+            except sqlite3.Error as e:
+                print(f"Format cache read failed: {e}")
+
+            metrics.inc("format_cache_requests_total", result="miss")
+            self._update_ratio()
+            return None
+
+    def _hit(self, tier, value):
+        self.hits += 1
+        metrics.inc("format_cache_requests_total", result=f"hit_{tier}")
+        self._update_ratio()
+        return value
+
+    def _update_ratio(self):
+        metrics.set("format_cache_hit_ratio", self.hits / self.lookups)
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > config.format_cache_memory_entries:
+            self.memory.popitem(last=False)
+
+    def put(self, key, value):
+        if not config.format_cache_enabled:
+            return
+        with self.lock:
+            self._remember(key, value)
+            try:
+                db = self._open()
+                old = db.execute("SELECT size FROM formatted WHERE key = ?", (key,)).fetchone()
+                size = len(key) + len(value.encode())
+                now = time.time()
+                db.execute("INSERT OR REPLACE INTO formatted VALUES (?, ?, ?, ?, ?)", (key, value, size, now, now))
+                self.disk_bytes += size - (old[0] if old else 0)
+                self._evict(db)
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Format cache write failed: {e}")
+
+    def _evict(self, db):
+        limit = config.format_cache_max_mb * 1024 * 1024
+        if self.disk_bytes <= limit:
+            return
+        # Trim to 90% so the next few puts don't each pay for an eviction
+        target = int(limit * 0.9)
+        removed = 0
+        for key, size in db.execute("SELECT key, size FROM formatted ORDER BY last_used").fetchall():
+            if self.disk_bytes <= target:
+                break
+            db.execute("DELETE FROM formatted WHERE key = ?", (key,))
+            self.memory.pop(key, None)
+            self.disk_bytes -= size
+            removed += 1
+        print(f"Format cache over {config.format_cache_max_mb} MB, evicted {removed} entries")
+
+
+format_cache = FormatCache()
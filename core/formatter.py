@@ -0,0 +1,166 @@
+import concurrent.futures
+import re
+import time
+from config import config
+from core.format_cache import cache_key, format_cache
+from core.formatter_backends import BACKENDS, PROMPT_VERSION
+from core.local_formatter import local_formatter
+from core.metrics import metrics
+
+# A sentence break before the end of the text, the model does better there
+INNER_SENTENCE_END = re.compile(r"[.!?]\s+\S")
+
+
+class TextFormatter:
+    # Post-processing of transcripts. Short ones get the local rules, longer
+    # ones go to the LLM backend picked by formatter_backend (see
+    # core/formatter_backends.py) with the local rules as the fallback.
+    def __init__(self):
+        self.backends = {name: cls() for name, cls in BACKENDS.items()}
+        # Backend calls run here so format_text can stop waiting at the budget
+        # while a late call finishes in the background
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="formatter")
+        self.late_tasks = set()  # Keeps late async calls referenced until they finish
+
+    @property
+    def backend(self):
+        backend = self.backends.get(config.formatter_backend)
+        if backend is None:
+            print(f"Unknown formatter backend '{config.formatter_backend}', using gemini")
+            backend = self.backends["gemini"]
+        return backend
+
+    @property
+    def configured(self):
+        return self.backend.configured
+
+    def configure(self):
+        # Settings changed, the other backends are rebuilt when next picked
+        current = self.backend
+        for backend in self.backends.values():
+            if backend is not current:
+                backend.configured = False
+        return current.configure()
+
+    @staticmethod
+    def _is_simple(raw_text):
+        # A few words in one sentence gain little from the model and would
+        # still pay a full round trip
+        return (
+            len(raw_text.split()) <= config.local_format_max_words
+            and not INNER_SENTENCE_END.search(raw_text)
+        )
+
+    @staticmethod
+    def _format_locally(raw_text, reason):
+        metrics.inc("local_format_total", reason=reason)
+        return local_formatter.format_text(raw_text)
+
+    def _prepare(self, raw_text):
+        # (backend, cache key, result), result set when no backend call is needed
+        if not raw_text or not raw_text.strip():
+            return None, None, raw_text
+
+        if self._is_simple(raw_text):
+            return None, None, self._format_locally(raw_text, "short")
+
+        backend = self.backend
+        if not backend.configured:
+            if not backend.configure():
+                return None, None, self._format_locally(raw_text, "backend_off") # Fallback
+
+        key = cache_key(raw_text, f"{backend.name}:{backend.model()}", PROMPT_VERSION)
+        return backend, key, format_cache.get(key)
+
+    def format_text(self, raw_text):
+        backend, key, result = self._prepare(raw_text)
+        if result is not None or backend is None:
+            return result
+
+        # The backend gets format_budget_ms. The local result is worked out
+        # while it runs and pasted instead if the backend is late.
+        started, budget_ms = time.perf_counter(), config.format_budget_ms
+        future = self.pool.submit(self._call_backend, backend, raw_text, key)
+        local_text = local_formatter.format_text(raw_text)
+        try:
+            formatted_text = future.result(timeout=self._budget(budget_ms))
+        except concurrent.futures.TimeoutError:
+            future.add_done_callback(lambda f: self._log_late(f, backend, local_text, started, budget_ms))
+            return self._over_budget(backend, local_text, budget_ms)
+        return self._pick(formatted_text, local_text)
+
+    @staticmethod
+    def _budget(budget_ms):
+        # None waits for the backend however long it takes
+        return budget_ms / 1000 if budget_ms > 0 else None
+
+    @staticmethod
+    def _over_budget(backend, local_text, budget_ms):
+        metrics.inc("format_budget_misses_total", backend=backend.name)
+        metrics.inc("local_format_total", reason="over_budget")
+        print(f"{backend.name} missed the {budget_ms} ms budget, pasting the local result")
+        return local_text
+
+    @staticmethod
+    def _pick(formatted_text, local_text):
+        if formatted_text is None:
+            metrics.inc("local_format_total", reason="backend_error")
+            return local_text
+        print(f"Formatted: {formatted_text[:50]}...")
+        return formatted_text
+
+    @staticmethod
+    def _log_late(future, backend, local_text, started, budget_ms):
+        # Not pasted, only logged so the two can be compared. It is cached
+        # by _call_backend, so the same transcript gets it next time.
+        formatted_text = future.result()
+        if formatted_text is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"Late {backend.name} result after {elapsed_ms:.0f} ms (budget {budget_ms} ms)")
+        print(f"  pasted (local): {local_text[:80]}")
+        print(f"  {backend.name + ':':15} {formatted_text[:80]}")
+
+    @staticmethod
+    def _finish(backend, key, formatted_text, error):
+        # Errors are logged and turned into None, a late failure has nobody to raise to
+        if error is not None:
+            metrics.inc("formatter_calls_total", backend=backend.name, result="error")
+            print(f"Error calling {backend.name} formatter: {error}")
+            return None
+        metrics.inc("formatter_calls_total", backend=backend.name, result="ok")
+        format_cache.put(key, formatted_text)
+        return formatted_text
+
+    def _call_backend(self, backend, raw_text, key):
+        try:
+            return self._finish(backend, key, backend.generate(raw_text), None)
+        except Exception as e:
+            return self._finish(backend, key, None, e)
+
+    async def format_text_async(self, raw_text):
+        # Same as format_text for callers on an event loop (the web server)
+        import asyncio
+        backend, key, result = self._prepare(raw_text)
+        if result is not None or backend is None:
+            return result
+
+        started, budget_ms = time.perf_counter(), config.format_budget_ms
+        task = asyncio.ensure_future(self._call_backend_async(backend, raw_text, key))
+        local_text = local_formatter.format_text(raw_text)
+        done, _ = await asyncio.wait({task}, timeout=self._budget(budget_ms))
+        if not done:
+            self.late_tasks.add(task)
+            task.add_done_callback(self.late_tasks.discard)
+            task.add_done_callback(lambda t: self._log_late(t, backend, local_text, started, budget_ms))
+            return self._over_budget(backend, local_text, budget_ms)
+        return self._pick(task.result(), local_text)
+
+    async def _call_backend_async(self, backend, raw_text, key):
+        try:
+            return self._finish(backend, key, await backend.generate_async(raw_text), None)
+        except Exception as e:
+            return self._finish(backend, key, None, e)
+
+
+text_formatter = TextFormatter()
@@ -0,0 +1,285 @@
+import hashlib
+import json
+import time
+from config import config
+
+SYSTEM_PROMPT = (
+    "You are a precise text correction and formatting engine. Your task is to fix grammar, punctuation, "
+    "and capitalization errors in the provided text. You should also format the text for readability.\n"
+    "RULES:\n"
+    "1. Do NOT change the meaning or remove content.\n"
+    "2. Do NOT add conversational filler (like 'Here is the text').\n"
+    "3. USE bullet points ( - ) and newlines where appropriate to structure lists or distinct thoughts.\n"
+    "4. Output ONLY the formatted text."
+)
+
+# Part of the cache key, editing the prompt invalidates earlier results
+PROMPT_VERSION = hashlib.sha256(SYSTEM_PROMPT.encode()).hexdigest()[:12]
+
+# Worth another try: rate limited or briefly unavailable
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FormatterError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class FormatterBackend:
+    # An LLM that formats text over HTTP. Subclasses fill in the URL, headers,
+    # request body and how to read the answer; the client, keep-alive and
+    # retries live here. One httpx client is built per configuration and
+    # reused, so calls after the first skip DNS, TCP and TLS setup.
+    name = None
+
+    def __init__(self):
+        self.configured = False
+        self.client = None
+        self.async_client = None
+        self.url = None
+
+    def enabled(self):
+        raise NotImplementedError
+
+    def model(self):
+        raise NotImplementedError
+
+    def endpoint(self):
+        raise NotImplementedError
+
+    def headers(self):
+        return {"Content-Type": "application/json"}
+
+    def configure(self):
+        if not self.enabled():
+            self.configured = False
+            return False
+
+        try:
+            import httpx
+            old_client = self.client
+            self.url = self.endpoint()
+            self.client = httpx.Client(headers=self.headers(), timeout=self._timeout(), limits=self._limits())
+            # The async client belongs to the loop that created it, a new one
+            # is made on the next generate_async call
+            self.async_client = None
+            self.configured = True
+            if old_client:
+                old_client.close()
+            return True
+        except Exception as e:
+            print(f"Error configuring {self.name} formatter: {e}")
+            return False
+
+    @staticmethod
+    def _timeout():
+        import httpx
+        return httpx.Timeout(config.formatter_read_timeout, connect=config.formatter_connect_timeout)
+
+    @staticmethod
+    def _limits():
+        import httpx
+        # A couple of idle connections is plenty for one user, kept open long
+        # enough to span the gap between dictations
+        return httpx.Limits(max_connections=4, max_keepalive_connections=2, keepalive_expiry=300)
+
+    @staticmethod
+    def _should_retry(attempt, status=None):
+        # Only connection failures and retryable statuses. A read timeout is
+        # not retried, the user has already waited the whole timeout.
+        if attempt >= config.formatter_retries:
+            return False
+        return status is None or status in RETRY_STATUSES
+
+    @staticmethod
+    def _raise_for_status(response, body):
+        raise FormatterError(f"HTTP {response.status_code}: {body[:200]}", response.status_code)
+
+    def generate(self, raw_text):
+        import httpx
+        attempt = 0
+        while True:
+            try:
+                return self._request(raw_text)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if not self._should_retry(attempt):
+                    raise
+            except FormatterError as e:
+                if e.status is None or not self._should_retry(attempt, e.status):
+                    raise
+            attempt += 1
+            time.sleep(0.2 * 2 ** (attempt - 1))
+
+    async def generate_async(self, raw_text):
+        import asyncio
+        import httpx
+        if self.async_client is None:
+            self.async_client = httpx.AsyncClient(headers=self.headers(), timeout=self._timeout(), limits=self._limits())
+        attempt = 0
+        while True:
+            try:
+                return await self._request_async(raw_text)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if not self._should_retry(attempt):
+                    raise
+            except FormatterError as e:
+                if e.status is None or not self._should_retry(attempt, e.status):
+                    raise
+            attempt += 1
+            await asyncio.sleep(0.2 * 2 ** (attempt - 1))
+
+    def _request(self, raw_text):
+        raise NotImplementedError
+
+    async def _request_async(self, raw_text):
+        raise NotImplementedError
+
+
+class GeminiBackend(FormatterBackend):
+    # Gemini REST API. The prompt goes in systemInstruction instead of being
+    # pasted in front of every transcript.
+    name = "gemini"
+
+    def enabled(self):
+        # Silent if the key is missing, the user might not want AI features
+        return bool(config.gemini_api_key)
+
+    def model(self):
+        return config.gemini_model
+
+    def endpoint(self):
+        return f"{config.gemini_base_url.rstrip('/')}/models/{config.gemini_model}:generateContent"
+
+    def headers(self):
+        return {"x-goog-api-key": config.gemini_api_key, "Content-Type": "application/json"}
+
+    @staticmethod
+    def _body(raw_text):
+        return {
+            "systemInstruction": {"parts": [{"text": SYSTEM_PROMPT}]},
+            "contents": [{"role": "user", "parts": [{"text": raw_text}]}],
+            "generationConfig": {"temperature": 0.0},
+        }
+
+    @staticmethod
+    def _parse(data):
+        candidates = data.get("candidates") or []
+        if not candidates:
+            raise FormatterError(f"No candidates returned: {data.get('promptFeedback', data)}")
+        parts = candidates[0].get("content", {}).get("parts", [])
+        text = "".join(part.get("text", "") for part in parts).strip()
+        if not text:
+            raise FormatterError(f"Empty response (finishReason {candidates[0].get('finishReason')})")
+        return text
+
+    def _request(self, raw_text):
+        response = self.client.post(self.url, json=self._body(raw_text))
+        if response.status_code != 200:
+            self._raise_for_status(response, response.text)
+        return self._parse(response.json())
+
+    async def _request_async(self, raw_text):
+        response = await self.async_client.post(self.url, json=self._body(raw_text))
+        if response.status_code != 200:
+            self._raise_for_status(response, response.text)
+        return self._parse(response.json())
+
+
+class OpenAIBackend(FormatterBackend):
+    # Any server with an OpenAI-compatible /chat/completions endpoint, e.g.
+    # llama.cpp, vLLM or Ollama on this machine, so the text never leaves it.
+    # With openai_stream on, the answer is read as server-sent events: the
+    # read timeout then applies between tokens rather than to the whole
+    # answer, and a slow model that is still producing text isn't cut off.
+    name = "openai"
+
+    def enabled(self):
+        return bool(config.openai_base_url)
+
+    def model(self):
+        return config.openai_model
+
+    def endpoint(self):
+        return f"{config.openai_base_url.rstrip('/')}/chat/completions"
+
+    def headers(self):
+        headers = {"Content-Type": "application/json"}
+        if config.openai_api_key:
+            headers["Authorization"] = f"Bearer {config.openai_api_key}"
+        return headers
+
+    @staticmethod
+    def _body(raw_text):
+        body = {
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": raw_text},
+            ],
+            "temperature": 0.0,
+            "stream": config.openai_stream,
+        }
+        if config.openai_model:
+            body["model"] = config.openai_model  # llama.cpp serves one model and accepts none
+        return body
+
+    @staticmethod
+    def _parse(data):
+        choices = data.get("choices") or []
+        if not choices:
+            raise FormatterError(f"No choices returned: {data}")
+        text = (choices[0].get("message", {}).get("content") or "").strip()
+        if not text:
+            raise FormatterError(f"Empty response (finish_reason {choices[0].get('finish_reason')})")
+        return text
+
+    @staticmethod
+    def _stream_delta(line):
+        # Text of one "data: {...}" event of a streamed completion
+        payload = line[5:].strip() if line.startswith("data:") else ""
+        if not payload or payload == "[DONE]":
+            return ""
+        choices = json.loads(payload).get("choices") or []
+        return (choices[0].get("delta", {}).get("content") or "") if choices else ""
+
+    @staticmethod
+    def _join(parts):
+        text = "".join(parts).strip()
+        if not text:
+            raise FormatterError("Empty streamed response")
+        return text
+
+    def _request(self, raw_text):
+        if not config.openai_stream:
+            response = self.client.post(self.url, json=self._body(raw_text))
+            if response.status_code != 200:
+                self._raise_for_status(response, response.text)
+            return self._parse(response.json())
+
+        parts = []
+        with self.client.stream("POST", self.url, json=self._body(raw_text)) as response:
+            if response.status_code != 200:
+                self._raise_for_status(response, response.read().decode(errors="replace"))
+            # Read to the end even after [DONE], a half-read response can't go
+            # back to the pool and the next call would open a new connection
+            for line in response.iter_lines():
+                parts.append(self._stream_delta(line))
+        return self._join(parts)
+
+    async def _request_async(self, raw_text):
+        if not config.openai_stream:
+            response = await self.async_client.post(self.url, json=self._body(raw_text))
+            if response.status_code != 200:
+                self._raise_for_status(response, response.text)
+            return self._parse(response.json())
+
+        parts = []
+        async with self.async_client.stream("POST", self.url, json=self._body(raw_text)) as response:
+            if response.status_code != 200:
+                self._raise_for_status(response, (await response.aread()).decode(errors="replace"))
+            async for line in response.aiter_lines():
+                parts.append(self._stream_delta(line))
+        return self._join(parts)
+
+
+BACKENDS = {backend.name: backend for backend in (GeminiBackend, OpenAIBackend)}
@@ -0,0 +1,158 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from config import config
+from core.metrics import metrics
+
+SCHEMA = (
+    # status is how the job ended: done, cancelled or error
+    "CREATE TABLE IF NOT EXISTS history ("
+    "id INTEGER PRIMARY KEY, job_id INTEGER, created REAL NOT NULL, finished REAL NOT NULL, "
+    "raw_text TEXT NOT NULL, text TEXT NOT NULL, audio_seconds REAL, speech_seconds REAL, "
+    "total_seconds REAL, model TEXT, route TEXT, timings TEXT, status TEXT NOT NULL DEFAULT 'done')",
+    # External content: the index stores only tokens, the text stays in history
+    "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+    "raw_text, text, content='history', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN "
+    "INSERT INTO history_fts (rowid, raw_text, text) VALUES (new.id, new.raw_text, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN "
+    "INSERT INTO history_fts (history_fts, rowid, raw_text, text) VALUES ('delete', old.id, old.raw_text, old.text); END",
+)
+
+COLUMNS = (
+    "id", "job_id", "created", "finished", "raw_text", "text", "audio_seconds",
+    "speech_seconds", "total_seconds", "model", "route", "timings", "status",
+)
+
+MAX_PAGE = 200
+
+
+def match_query(text):
+    # Free text from the search box as an FTS5 query: every word has to be
+    # there, as a prefix, so "meet tom" finds "meeting tomorrow". Quoting each
+    # word keeps FTS5 operators and punctuation from being parsed.
+    words = [w.replace('"', '""') for w in text.split()]
+    return " ".join(f'"{w}"*' for w in words if w.strip('"'))
+
+
+class HistoryStore:
+    # Every dictation that reached the model, in SQLite with an FTS5 index over the raw and
+    # formatted text. append() only queues the row, a writer thread inserts
+    # whatever has piled up in one transaction, so the dictation path never
+    # waits on the disk. Ids are handed out by append() so callers can refer
+    # to an entry before it is written. Cancelled and failed jobs are kept
+    # too, with whatever text they got to, so nothing said is lost.
+    def __init__(self, path=None):
+        self.path = path or os.path.join(os.getcwd(), "history", "history.db")
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()  # Guards opening and next_id
+        self.read_lock = threading.Lock()  # A search doesn't hold up append()
+        self.db = None
+        self.next_id = None
+        self.writer = None
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent, only the last batch is at risk on power loss
+        return db
+
+    def _open(self):
+        # Called with self.lock held
+        if self.db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.db = self._connect()
+            for statement in SCHEMA:
+                self.db.execute(statement)
+            # Databases from before the status column
+            if "status" not in [row[1] for row in self.db.execute("PRAGMA table_info(history)")]:
+                self.db.execute("ALTER TABLE history ADD COLUMN status TEXT NOT NULL DEFAULT 'done'")
+            self.db.commit()
+            self.next_id = self.db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM history").fetchone()[0]
+            self.writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+            self.writer.start()
+        return self.db
+
+    def append(self, job, raw_text, text, audio_seconds=None, speech_seconds=None, status="done"):
+        if not config.history_enabled:
+            return None
+        finished = time.time()
+        with self.lock:
+            try:
+                self._open()
+            except sqlite3.Error as e:
+                print(f"History unavailable: {e}")
+                return None
+            entry_id = self.next_id
+            self.next_id += 1
+        self.pending.put((
+            entry_id, job.id, job.submitted_at, finished, raw_text, text, audio_seconds, speech_seconds,
+            finished - job.submitted_at, job.model, job.route,
+            json.dumps({stage: round(t * 1000, 1) for stage, t in job.timings.items()}), status,
+        ))
+        return entry_id
+
+    def _write_loop(self):
+        db = self._connect()
+        while True:
+            rows = [self.pending.get()]
+            # Take everything that queued up meanwhile
+            while len(rows) < config.history_batch_size:
+                try:
+                    rows.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            start = time.perf_counter()
+            try:
+                with db:
+                    db.executemany(
+                        f"INSERT INTO history ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows
+                    )
+                metrics.observe("history_write_seconds", time.perf_counter() - start)
+            except sqlite3.Error as e:
+                print(f"History write of {len(rows)} entries failed: {e}")
+            for _ in rows:
+                self.pending.task_done()
+
+    def flush(self):
+        # Blocks until everything appended so far is on disk
+        if self.writer is not None:
+            self.pending.join()
+
+    def search(self, q=None, before=None, limit=50):
+        # Newest first, one page at a time. Pages are keyed by id (pass the
+        # previous page's next_before) rather than OFFSET, so page 1000 costs
+        # the same as page 1.
+        limit = max(1, min(int(limit), MAX_PAGE))
+        before = int(before) if before else None
+        match = match_query(q) if q else ""
+        columns = ", ".join(f"h.{c}" for c in COLUMNS)
+        if match:
+            sql = (
+                f"SELECT {columns} FROM history_fts f JOIN history h ON h.id = f.rowid "
+                f"WHERE history_fts MATCH ?{' AND f.rowid < ?' if before else ''} ORDER BY f.rowid DESC LIMIT ?"
+            )
+            params = [match] + ([before] if before else []) + [limit]
+        else:
+            sql = f"SELECT {columns} FROM history h{' WHERE h.id < ?' if before else ''} ORDER BY h.id DESC LIMIT ?"
+            params = ([before] if before else []) + [limit]
+
+        with self.lock:
+            db = self._open()
+        with self.read_lock:
+            rows = db.execute(sql, params).fetchall()
+        items = []
+        for row in rows:
+            item = dict(zip(COLUMNS, row))
+            item["timings_ms"] = json.loads(item.pop("timings") or "{}")
+            items.append(item)
+        return {
+            "items": items,
+            "next_before": items[-1]["id"] if len(items) == limit else None,
+        }
+
+
+history_store = HistoryStore()
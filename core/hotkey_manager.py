@@ -7,6 +7,7 @@ from config import config
 class HotkeyManager(QObject):
     # Signals to communicate with the GUI/Main thread
     recording_toggled = pyqtSignal()
+    cancel_requested = pyqtSignal()
 
     def __init__(self):
         super().__init__()
@@ -32,6 +33,8 @@ class HotkeyManager(QObject):
         
         try:
             keyboard.add_hotkey(config.hotkey, self._on_hotkey)
+            if config.cancel_hotkey:
+                keyboard.add_hotkey(config.cancel_hotkey, self._on_cancel_hotkey)
             
             # Keep the thread alive
             while self.running:
@@ -43,17 +46,29 @@ class HotkeyManager(QObject):
                 keyboard.remove_hotkey(config.hotkey)
             except Exception:
                 pass
+            try:
+                keyboard.remove_hotkey(config.cancel_hotkey)
+            except Exception:
+                pass
 
     def _on_hotkey(self):
         print("Hotkey pressed!")
         self.recording_toggled.emit()
 
+    def _on_cancel_hotkey(self):
+        print("Cancel hotkey pressed!")
+        self.cancel_requested.emit()
+
     def stop(self):
         self.running = False
         try:
             keyboard.remove_hotkey(config.hotkey)
         except:
             pass
+        try:
+            keyboard.remove_hotkey(config.cancel_hotkey)
+        except:
+            pass
         if self.thread:
             self.thread.join(timeout=1)
 
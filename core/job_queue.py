@@ -0,0 +1,141 @@
+import itertools
+import threading
+import time
+from collections import deque
+from config import config
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, audio, session=None):
+        self.id = next(Job._ids)
+        self.audio = audio
+        self.session = session  # StreamingSession when the audio was decoded while recording
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.timings = {}  # stage -> seconds
+        self.model = None  # Model that decoded it
+        self.route = None  # Routing rule that picked the model, see Transcriber.route
+        self.recording = None  # Name in the recording archive when save_recordings is on
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def wait_seconds(self):
+        end = self.started_at or time.time()
+        return end - self.submitted_at
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.session:
+            self.session.abort()
+
+    def check(self):
+        # Called by the handler between stages
+        if self.cancelled:
+            raise JobCancelled()
+
+
+class TranscriptionQueue:
+    # One worker in front of the Transcriber. Jobs run strictly in submission
+    # order, so pastes come out in the order they were dictated, and only one
+    # decode competes for the model and the CPU at a time.
+    def __init__(self, handler):
+        self.handler = handler
+        self.pending = deque()
+        self.current = None
+        self.condition = threading.Condition()
+        self.last_wait = 0.0
+        self.total_wait = 0.0
+        self.completed = 0
+        self.rejected = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, job):
+        with self.condition:
+            if len(self.pending) >= config.max_queued_jobs:
+                self.rejected += 1
+                job.status = "rejected"
+                return False
+            self.pending.append(job)
+            self.condition.notify()
+        return True
+
+    def position(self, job):
+        # 0 while running, 1 for the next job in line and so on
+        with self.condition:
+            if job is self.current:
+                return 0
+            for i, pending in enumerate(self.pending):
+                if pending is job:
+                    return i + 1
+        return None
+
+    def cancel_all(self):
+        with self.condition:
+            jobs = list(self.pending)
+            self.pending.clear()
+            if self.current:
+                jobs.append(self.current)
+        for job in jobs:
+            job.cancel()
+            if job.status == "queued":
+                job.status = "cancelled"
+        if jobs:
+            print(f"Cancelled {len(jobs)} transcription job(s)")
+        return len(jobs)
+
+    def stats(self):
+        with self.condition:
+            oldest = self.pending[0].wait_seconds if self.pending else 0.0
+            return {
+                "queue_depth": len(self.pending),
+                "in_flight": self.current.id if self.current else None,
+                "last_wait_ms": round(self.last_wait * 1000, 1),
+                "avg_wait_ms": round(self.total_wait / self.completed * 1000, 1) if self.completed else 0.0,
+                "oldest_wait_ms": round(oldest * 1000, 1),
+                "rejected": self.rejected,
+            }
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                job = self.pending.popleft()
+                self.current = job
+
+            if job.cancelled:
+                with self.condition:
+                    self.current = None
+                continue
+
+            job.started_at = time.time()
+            job.status = "running"
+            try:
+                self.handler(job)
+                job.status = "cancelled" if job.cancelled else "done"
+            except JobCancelled:
+                job.status = "cancelled"
+                print(f"Job {job.id} cancelled")
+            except Exception as e:
+                job.status = "error"
+                print(f"Error in job {job.id}: {e}")
+            finally:
+                job.finished_at = time.time()
+                with self.condition:
+                    self.current = None
+                    self.last_wait = job.wait_seconds
+                    self.total_wait += self.last_wait
+                    self.completed += 1
@@ -0,0 +1,10 @@
+import json
+import os
+
+
+def write_json_atomic(path, payload):
+    # Write then rename, a crash mid-write must not lose the whole file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=4)
+    os.replace(tmp_path, path)
@@ -0,0 +1,194 @@
+import re
+
+# Rule-based cleanup that runs in microseconds, used for short utterances that
+# aren't worth a network round trip and as the fallback when the LLM backend
+# is off, failing or late. Every pattern is compiled once at import.
+
+SMALL_NUMBERS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+TENS = {
+    "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+SCALES = {"hundred": 100, "thousand": 1000, "million": 10**6, "billion": 10**9}
+ORDINALS = ("first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth")
+QUESTION_WORDS = {
+    "who", "what", "when", "where", "why", "how", "which", "is", "are", "am", "was", "were",
+    "can", "could", "would", "should", "will", "do", "does", "did", "have", "has", "shall", "may",
+}
+
+_NUMBER_WORD = "|".join(sorted(list(SMALL_NUMBERS) + list(TENS) + list(SCALES), key=len, reverse=True))
+NUMBER_RUN = re.compile(
+    rf"\b(?:a\s+(?=(?:hundred|thousand|million|billion)\b))?(?:{_NUMBER_WORD})"
+    rf"(?:(?:[\s-]+|\s+and\s+)(?:{_NUMBER_WORD}))*\b(?:\s+percent\b)?",
+    re.IGNORECASE,
+)
+NUMBER_TOKEN = re.compile(r"[a-z]+", re.IGNORECASE)
+
+# "first, ... second, ... finally ..." / "number one ... number two ..."
+LIST_MARKER = re.compile(
+    rf"\b(and\s+|then\s+)?"
+    rf"(?:({'|'.join(ORDINALS)})(?:ly)?|number\s+({'|'.join(list(SMALL_NUMBERS)[1:11])})|(finally|lastly))\b([,:]?)\s*",
+    re.IGNORECASE,
+)
+ITEM_TRAILER = re.compile(r"(?:[\s,;:.]+|\s+and)+$", re.IGNORECASE)
+
+SPACES = re.compile(r"[ \t]+")
+SPACE_BEFORE_PUNCT = re.compile(r"\s+([,.!?;:%])")
+SENTENCE_START = re.compile(r"(^|[.!?]\s+|\n\s*(?:- )?)([a-z])(?!\.[a-z]\.)")  # Not "i.e."/"e.g." themselves
+LONE_I = re.compile(r"(?<![\w'.])i(?='(?:m|ve|ll|d)\b|[\s,!?;:]|\.(?!\w)|$)")
+SENTENCE_END = re.compile(r"[.!?]\s+")
+# A period after these doesn't end the sentence: "mr. smith", "i.e. no"
+ABBREVIATION = re.compile(
+    r"(?:^|[\s(])(?:mr|mrs|ms|dr|prof|st|jr|sr|vs|etc|approx|cf|e\.g|i\.e)\.$", re.IGNORECASE
+)
+ENDS_CLOSED = re.compile(r"[.!?:;…\"')\]]$")
+
+
+def _words_to_number(words):
+    # None when the words don't form one number, e.g. "one two" (digits read out)
+    total = current = 0
+    previous = None
+    for word in words:
+        if word == "a":
+            current = 1
+            previous = "small"
+        elif word in SMALL_NUMBERS:
+            value = SMALL_NUMBERS[word]
+            if previous == "small" or (previous == "tens" and value >= 10):
+                return None
+            current += value
+            previous = "small"
+        elif word in TENS:
+            if previous in ("small", "tens"):
+                return None
+            current += TENS[word]
+            previous = "tens"
+        else:
+            scale = SCALES[word]
+            if scale == 100:
+                if previous not in ("small", "tens") or current >= 100:
+                    return None
+                current *= 100
+            else:
+                if previous is None:
+                    return None
+                total += current * scale
+                current = 0
+            previous = "scale"
+    return total + current
+
+
+def _replace_number(match):
+    text = match.group(0)
+    words = [w.lower() for w in NUMBER_TOKEN.findall(text) if w.lower() != "and"]
+    percent = words[-1] == "percent"
+    if percent:
+        words = words[:-1]
+    value = _words_to_number(words)
+    # Style guide convention: spell out zero to nine unless it's a percentage
+    if value is None or (value < 10 and not percent):
+        return text
+    number = f"{value:,}" if value >= 10000 else str(value)  # Years and the like stay 2024, not 2,024
+    return f"{number}%" if percent else number
+
+
+def normalize_numbers(text):
+    return NUMBER_RUN.sub(_replace_number, text)
+
+
+def _marker_index(match):
+    _, ordinal, number, final, _ = match.groups()
+    if ordinal:
+        return ORDINALS.index(ordinal.lower()) + 1
+    if number:
+        return SMALL_NUMBERS[number.lower()]
+    return None  # finally/lastly
+
+
+def split_spoken_list(text):
+    # Returns (intro, items) when the text dictates a list, otherwise None
+    markers = []
+    for match in LIST_MARKER.finditer(text):
+        # Only at a clause boundary or followed by a comma, so "at first I
+        # thought second hand..." stays prose
+        before = text[:match.start()].rstrip()
+        if before and before[-1] not in ".,;:!?" and not match.group(1) and not match.group(5):
+            continue
+        index = _marker_index(match)
+        expected = len(markers) + 1
+        if index == expected or (index is None and len(markers) >= 2):
+            markers.append(match)
+            if index is None:
+                break
+        elif index == 1:
+            markers = [match]  # Restart, the earlier "first" wasn't a list
+    if len(markers) < 2:
+        return None
+
+    intro = text[:markers[0].start()].strip()
+    items = []
+    for i, match in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        item = ITEM_TRAILER.sub("", text[match.end():end]).strip()
+        if not item:
+            return None
+        items.append(item)
+    return intro, items
+
+
+def _after_abbreviation(text, dot):
+    return text[dot] == "." and ABBREVIATION.search(text[:dot + 1]) is not None
+
+
+def _capitalize(match):
+    if match.group(1).startswith(".") and _after_abbreviation(match.string, match.start()):
+        return match.group(0)
+    return match.group(1) + match.group(2).upper()
+
+
+def capitalize_sentences(text):
+    text = SENTENCE_START.sub(_capitalize, text)
+    return LONE_I.sub("I", text)
+
+
+def close_sentence(text):
+    if not text or ENDS_CLOSED.search(text):
+        return text
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        if not _after_abbreviation(text, match.start()):
+            start = match.end()
+    words = text[start:].split(maxsplit=1)
+    first_word = words[0].lower() if words else ""
+    return text + ("?" if first_word in QUESTION_WORDS else ".")
+
+
+class LocalFormatter:
+    def format_text(self, raw_text):
+        if not raw_text or not raw_text.strip():
+            return raw_text
+
+        text = SPACES.sub(" ", raw_text.strip())
+        text = normalize_numbers(text)
+        # Before the list split, or "first , ..." leaves the comma in the item
+        text = SPACE_BEFORE_PUNCT.sub(r"\1", text)
+
+        spoken_list = split_spoken_list(text)
+        if spoken_list:
+            intro, items = spoken_list
+            lines = []
+            if intro:
+                intro = ITEM_TRAILER.sub("", intro)
+                lines.append(capitalize_sentences(intro) + ":")
+            lines += ["- " + capitalize_sentences(item[:1].upper() + item[1:]) for item in items]
+            return "\n".join(lines)
+
+        text = capitalize_sentences(text)
+        return close_sentence(text)
+
+
+local_formatter = LocalFormatter()
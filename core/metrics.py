@@ -0,0 +1,123 @@
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+PREFIX = "whisperflow_"
+QUANTILES = (0.5, 0.95, 0.99)
+
+HELP = {
+    "stage_seconds": "Time spent in each stage of a dictation",
+    "realtime_factor": "Decode seconds per second of audio",
+    "routed_decode_seconds": "Decode time of routed dictations by model and routing rule",
+    "audio_seconds_total": "Seconds of audio decoded",
+    "jobs_total": "Transcription jobs by outcome",
+    "formatter_calls_total": "Formatter backend calls by backend and result",
+    "local_format_total": "Transcripts formatted by the local formatter, by reason",
+    "format_budget_misses_total": "Formatting calls where the backend missed format_budget_ms and the local result was pasted",
+    "format_cache_requests_total": "Formatter cache lookups by result",
+    "format_cache_hit_ratio": "Share of formatter cache lookups that were hits",
+    "history_write_seconds": "Time to write one batch of history entries",
+    "recordings_archive_bytes": "Disk space used by saved recordings",
+    "queue_depth": "Recordings waiting for the transcription worker",
+    "startup_seconds": "Seconds from launch to each startup milestone",
+}
+
+
+class RollingHistogram:
+    # Percentiles over the most recent `window` observations, with lifetime
+    # count and sum so rates can still be computed by the scraper
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        # Nearest-rank percentile
+        index = max(0, math.ceil(q * len(ordered)) - 1)
+        return ordered[index]
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # (name, labels) -> RollingHistogram
+        self.counters = {}    # (name, labels) -> float
+        self.gauges = {}      # (name, labels) -> float
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = RollingHistogram()
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[self._key(name, labels)] = value
+
+    @contextmanager
+    def time_stage(self, stage, timings=None):
+        # Records the block's duration as stage_seconds{stage=...} and, if
+        # given, into a per-job timings dict
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("stage_seconds", elapsed, stage=stage)
+            if timings is not None:
+                timings[stage] = elapsed
+
+    def render_prometheus(self):
+        lines = []
+        with self.lock:
+            families = {}
+            for store, kind in ((self.histograms, "summary"), (self.counters, "counter"), (self.gauges, "gauge")):
+                for (name, labels), value in store.items():
+                    families.setdefault(name, (kind, []))[1].append((labels, value))
+
+            for name in sorted(families):
+                kind, series = families[name]
+                metric = PREFIX + name
+                lines.append(f"# HELP {metric} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} {kind}")
+                for labels, value in sorted(series, key=lambda s: s[0]):
+                    if kind == "summary":
+                        for q in QUANTILES:
+                            quantile_labels = labels + (("quantile", str(q)),)
+                            lines.append(f"{metric}{_format_labels(quantile_labels)} {value.percentile(q):.6f}")
+                        lines.append(f"{metric}_sum{_format_labels(labels)} {value.sum:.6f}")
+                        lines.append(f"{metric}_count{_format_labels(labels)} {value.count}")
+                    else:
+                        lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join('{}="{}"'.format(k, str(v).replace('"', "'")) for k, v in labels)
+    return "{" + inner + "}"
+
+
+metrics = Metrics()
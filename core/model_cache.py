@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+from config import config
+
+# Rough bytes per weight once loaded, used to scale the size of model.bin on
+# disk to the compute type it is loaded with
+BYTES_PER_WEIGHT = {
+    "float32": 4,
+    "float16": 2,
+    "bfloat16": 2,
+    "int16": 2,
+    "int8": 1,
+    "int8_float32": 1,
+    "int8_float16": 1,
+    "int8_bfloat16": 1,
+}
+
+
+def estimate_bytes(model_bin_bytes, stored_as, compute_type):
+    # Faster-whisper's converted models ship as float16 unless the index says otherwise
+    stored = BYTES_PER_WEIGHT.get(stored_as or "float16", 2)
+    loaded = BYTES_PER_WEIGHT.get(compute_type, stored)
+    return int(model_bin_bytes * loaded / stored)
+
+
+class ResidentModel:
+    def __init__(self, key, model, size_bytes):
+        self.key = key  # (model_size, device, compute_type)
+        self.model = model
+        self.size_bytes = size_bytes
+        self.batched = None  # BatchedInferencePipeline, built on first long recording
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+
+    @property
+    def device(self):
+        return self.key[1]
+
+
+class ModelCache:
+    # Loaded models by (model_size, device, compute_type) in least recently used
+    # order. RAM and VRAM have separate budgets. Before a model is loaded,
+    # make_room() evicts the least recently used ones on the same device until
+    # it fits. A single model larger than the budget is still loaded, it just
+    # ends up alone.
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+                entry.last_used = time.time()
+            return entry
+
+    def make_room(self, device, size_bytes, keep=None):
+        # Call before loading, so the evicted models are freed before the new
+        # one needs the memory. With keep, trims the cache around a resident
+        # model instead, e.g. after the budget was lowered.
+        with self.lock:
+            evicted = self._evict(device, size_bytes, keep)
+        for old in evicted:
+            print(f"Evicted {old.key[0]} ({old.key[1]}, {old.key[2]}) from the model cache")
+        return len(evicted)
+
+    def put(self, key, model, size_bytes):
+        entry = ResidentModel(key, model, size_bytes)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+        return entry
+
+    def _budget(self, device):
+        mb = config.model_cache_vram_mb if device == "cuda" else config.model_cache_ram_mb
+        return mb * 1024 * 1024
+
+    def _evict(self, device, incoming_bytes, keep=None):
+        budget = self._budget(device)
+        same_device = [e for e in self.entries.values() if e.device == device]
+        used = sum(e.size_bytes for e in same_device) + incoming_bytes
+        evicted = []
+        for entry in same_device:  # Oldest first
+            if used <= budget:
+                break
+            if entry is keep:
+                continue
+            del self.entries[entry.key]
+            used -= entry.size_bytes
+            evicted.append(entry)
+        return evicted
+
+    def clear(self):
+        with self.lock:
+            count = len(self.entries)
+            self.entries.clear()
+        return count
+
+    def resident(self, active_key=None):
+        now = time.time()
+        with self.lock:
+            return [
+                {
+                    "model": e.key[0],
+                    "device": e.key[1],
+                    "compute_type": e.key[2],
+                    "size_mb": round(e.size_bytes / 1024**2, 1),
+                    "active": e.key == active_key,
+                    "idle_seconds": round(now - e.last_used, 1),
+                }
+                for e in reversed(self.entries.values())  # Most recently used first
+            ]
@@ -1,24 +1,232 @@
+"""Local index of downloaded models.
+
+    python -m core.model_manager list
+    python -m core.model_manager prefetch large-v3 distil-small.en
+    python -m core.model_manager verify            # every indexed model
+
+Models resolve through models/index.json first, so loading a model that is
+already on disk never touches the Hugging Face Hub. prefetch downloads and
+checksums models ahead of time, verify re-hashes them against the index.
+"""
+import argparse
+import hashlib
+import json
 import os
-from faster_whisper import download_model
+import struct
+import threading
+import time
 from config import config
+from core.json_file import write_json_atomic
+
+# Files a CTranslate2 Whisper model can't load without
+REQUIRED_FILES = ("model.bin", "config.json")
+
+# Order of the DataType enum in CTranslate2's types.h
+CT2_DTYPES = ("float32", "int8", "int16", "int32", "float16", "bfloat16")
+
+
+def read_quantization(model_bin):
+    # Walks the variable headers of a CTranslate2 model.bin, skipping over the
+    # weights, and names the quantization from the dtypes it finds. Returns
+    # None for formats older than binary version 4 (no dtype ids).
+    def read(fmt):
+        size = struct.calcsize(fmt)
+        return struct.unpack(fmt, f.read(size))
+
+    def read_string():
+        (length,) = read("<H")
+        return f.read(length)[:-1].decode()
+
+    sizes = {}
+    with open(model_bin, "rb") as f:
+        (version,) = read("<I")
+        if version < 4:
+            return None
+        read_string()  # Spec name
+        read("<I")  # Spec revision
+        (count,) = read("<I")
+        for _ in range(count):
+            read_string()
+            (rank,) = read("<B")
+            f.seek(4 * rank, os.SEEK_CUR)  # Dimensions
+            dtype, num_bytes = read("<BI")
+            name = CT2_DTYPES[dtype] if dtype < len(CT2_DTYPES) else "unknown"
+            sizes[name] = sizes.get(name, 0) + num_bytes
+            f.seek(num_bytes, os.SEEK_CUR)
+
+    if not sizes:
+        return None
+    if "int8" in sizes:
+        # Quantized weights, the remaining variables say what they run with
+        for other in ("float16", "bfloat16"):
+            if other in sizes:
+                return f"int8_{other}"
+        return "int8"
+    if "int16" in sizes:
+        return "int16"
+    return max(sizes, key=sizes.get)
+
+
+def sha256sum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 
 class ModelManager:
     def __init__(self):
         self.models_dir = os.path.join(os.getcwd(), "models")
         os.makedirs(self.models_dir, exist_ok=True)
+        self.index_path = os.path.join(self.models_dir, "index.json")
+        self.lock = threading.Lock()
+        self.index = self._read_index()  # model size -> entry
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f).get("models", {})
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Ignoring unreadable model index: {e}")
+            return {}
+
+    def _write_index(self):
+        write_json_atomic(self.index_path, {"models": self.index})
+
+    @staticmethod
+    def _is_complete(path, entry=None):
+        if not all(os.path.isfile(os.path.join(path, name)) for name in REQUIRED_FILES):
+            return False
+        # A stat is cheap enough to catch a truncated or replaced model.bin on every load
+        if entry and entry.get("model_bin_bytes"):
+            return os.path.getsize(os.path.join(path, "model.bin")) == entry["model_bin_bytes"]
+        return True
 
     def get_model_path(self, model_size=None):
         size = model_size or config.model_size
-        # Check if model is already downloaded (basic check)
-        # faster_whisper's download_model handles caching automatically, 
-        # so we can just call it. It returns the path to the model.
-        print(f"Checking/Downloading model: {size}...")
+        if os.path.isdir(size):
+            return size  # Already a path to a converted model
+
+        # Fast path: indexed and still on disk, no network
+        with self.lock:
+            entry = self.index.get(size)
+        if entry and self._is_complete(entry["path"], entry):
+            return entry["path"]
+
+        from faster_whisper import download_model  # Heavy import, only needed on a miss
+
+        # Downloaded before the index existed, or the index was lost
+        try:
+            model_path = download_model(size, cache_dir=self.models_dir, local_files_only=True)
+            if self._is_complete(model_path):
+                self._add(size, model_path, checksum=False)
+                print(f"Indexed cached model {size} at {model_path}")
+                return model_path
+        except Exception:
+            pass
+
+        print(f"Downloading model: {size}...")
         try:
             model_path = download_model(size, cache_dir=self.models_dir)
             print(f"Model available at: {model_path}")
-            return model_path
         except Exception as e:
             print(f"Error downloading model {size}: {e}")
             raise
+        # Hash right after the download, that's already the slow path
+        self._add(size, model_path, checksum=True)
+        return model_path
+
+    def _add(self, size, path, checksum):
+        model_bin = os.path.join(path, "model.bin")
+        entry = {
+            "path": path,
+            "size_bytes": sum(
+                os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+                if os.path.isfile(os.path.join(path, name))
+            ),
+            "model_bin_bytes": os.path.getsize(model_bin),
+            "sha256": sha256sum(model_bin) if checksum else None,
+            "quantization": None,
+            "indexed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        try:
+            entry["quantization"] = read_quantization(model_bin)
+        except Exception as e:
+            print(f"Could not read quantization of {size}: {e}")
+        with self.lock:
+            self.index[size] = entry
+            self._write_index()
+        return entry
+
+    def prefetch(self, size):
+        path = self.get_model_path(size)
+        with self.lock:
+            entry = self.index.get(size)
+        if entry is None or entry.get("sha256") is None:
+            entry = self._add(size, path, checksum=True)
+        return entry
+
+    def verify(self, size):
+        # Re-hashes model.bin. An entry indexed without a checksum gets one now.
+        with self.lock:
+            entry = self.index.get(size)
+        if entry is None:
+            return False, "not in the index"
+        if not self._is_complete(entry["path"], entry):
+            return False, "files missing or truncated"
+        digest = sha256sum(os.path.join(entry["path"], "model.bin"))
+        if entry.get("sha256") and digest != entry["sha256"]:
+            return False, "checksum mismatch"
+        with self.lock:
+            entry["sha256"] = digest
+            entry["verified_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            self._write_index()
+        return True, "ok"
+
+    def local_models(self):
+        with self.lock:
+            entries = dict(self.index)
+        return [
+            {
+                "model": size,
+                "size_mb": round(entry["size_bytes"] / 1024**2, 1),
+                "quantization": entry.get("quantization"),
+                "verified": bool(entry.get("sha256")),
+            }
+            for size, entry in sorted(entries.items())
+            if self._is_complete(entry["path"], entry)
+        ]
+
 
 model_manager = ModelManager()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["list", "prefetch", "verify"])
+    parser.add_argument("models", nargs="*", help="Model sizes, default: configured model for prefetch, all indexed for verify")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for model in model_manager.local_models():
+            print(f"{model['model']:<20} {model['size_mb']:>9.1f} MB  {model['quantization'] or '?':<14} "
+                  f"{'verified' if model['verified'] else 'unverified'}")
+    elif args.command == "prefetch":
+        for size in args.models or [config.model_size]:
+            entry = model_manager.prefetch(size)
+            print(f"{size}: {entry['path']} ({entry['quantization']}, sha256 {entry['sha256'][:12]})")
+    else:
+        failed = 0
+        for size in args.models or sorted(model_manager.index):
+            ok, message = model_manager.verify(size)
+            failed += not ok
+            print(f"{size}: {message}")
+        if failed:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from config import config
+from core.json_file import write_json_atomic
+from core.metrics import metrics
+
+# soundfile format and subtype for each recording_format. Next to 16-bit WAV,
+# 16 kHz speech takes roughly half the space as FLAC (lossless) and about a
+# tenth as Opus.
+FORMATS = {
+    "flac": ("FLAC", "PCM_16", ".flac"),
+    "opus": ("OGG", "OPUS", ".opus"),
+    "wav": ("WAV", "PCM_16", ".wav"),
+}
+
+
+class RecordingArchive:
+    # Saved recordings when save_recordings is on. submit() only queues the
+    # audio, one encoder thread compresses it, updates recordings/index.json
+    # and applies the retention limits, so the dictation path does no file
+    # I/O. The index maps each file to its history entry, link() fills that
+    # in once the transcription is stored. Files that aren't in the index,
+    # such as WAVs from older versions, are left alone.
+    def __init__(self, directory=None):
+        self.dir = directory or os.path.join(os.getcwd(), "recordings")
+        self.index_path = os.path.join(self.dir, "index.json")
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+        self.index = None  # recording name -> entry, loaded by the worker
+        self.warned = False
+
+    def submit(self, audio, fs):
+        # Returns the recording's name, for link()
+        name = datetime.now().strftime("recording_%Y%m%d_%H%M%S_%f")[:-3]
+        self._start()
+        self.pending.put(("save", name, audio, fs))
+        return name
+
+    def link(self, name, history_id):
+        if name and history_id is not None:
+            self._start()
+            self.pending.put(("link", name, history_id))
+
+    def flush(self):
+        # Blocks until everything submitted so far is written
+        if self.worker is not None:
+            self.pending.join()
+
+    def _start(self):
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, name="recording-archive", daemon=True)
+                self.worker.start()
+
+    def _run(self):
+        os.makedirs(self.dir, exist_ok=True)
+        self.index = self._read_index()
+        self._prune()
+        while True:
+            op = self.pending.get()
+            try:
+                if op[0] == "save":
+                    self._save(*op[1:])
+                    self._prune()
+                elif op[1] in self.index:
+                    self.index[op[1]]["history_id"] = op[2]
+                self._write_index()
+            except Exception as e:
+                print(f"Recording archive error: {e}")
+            finally:
+                self.pending.task_done()
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f).get("recordings", {})
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Ignoring unreadable recordings index: {e}")
+            return {}
+
+    def _write_index(self):
+        write_json_atomic(self.index_path, {"recordings": self.index})
+
+    def _encode(self, path, audio, fs, fmt):
+        format_name, subtype, _ = FORMATS[fmt]
+        try:
+            import soundfile as sf
+            sf.write(path, np.clip(audio, -1.0, 1.0), fs, format=format_name, subtype=subtype)
+            return fmt
+        except (ImportError, OSError, RuntimeError, TypeError, ValueError) as e:
+            # soundfile missing, or a libsndfile built without FLAC/Opus
+            if not self.warned:
+                print(f"Can't write {fmt} recordings ({e}), saving WAV instead")
+                self.warned = True
+            if os.path.exists(path):
+                os.remove(path)
+        import scipy.io.wavfile as wav
+        wav.write(path, fs, (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16))
+        return "wav"
+
+    def _save(self, name, audio, fs):
+        fmt = config.recording_format if config.recording_format in FORMATS else "flac"
+        file_name = name + FORMATS[fmt][2]
+        start = time.perf_counter()
+        written = self._encode(os.path.join(self.dir, file_name), audio, fs, fmt)
+        if written != fmt:
+            # Fell back to WAV, keep the extension honest
+            wav_name = name + FORMATS[written][2]
+            os.replace(os.path.join(self.dir, file_name), os.path.join(self.dir, wav_name))
+            file_name, fmt = wav_name, written
+        metrics.observe("stage_seconds", time.perf_counter() - start, stage="archive_encode")
+
+        size = os.path.getsize(os.path.join(self.dir, file_name))
+        self.index[name] = {
+            "file": file_name,
+            "created": time.time(),
+            "seconds": round(len(audio) / fs, 3),
+            "format": fmt,
+            "bytes": size,
+            "history_id": None,
+        }
+        print(f"Recording saved to {os.path.join(self.dir, file_name)} ({size / 1024:.0f} KB {fmt})")
+
+    def _prune(self):
+        # Oldest first until both limits hold
+        max_bytes = config.recordings_max_mb * 1024 * 1024
+        max_age = config.recordings_max_days * 86400
+        now = time.time()
+        total = sum(entry["bytes"] for entry in self.index.values())
+        for name, entry in sorted(self.index.items(), key=lambda item: item[1]["created"]):
+            too_big = config.recordings_max_mb > 0 and total > max_bytes
+            too_old = config.recordings_max_days > 0 and now - entry["created"] > max_age
+            if not (too_big or too_old):
+                break
+            try:
+                os.remove(os.path.join(self.dir, entry["file"]))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Could not delete old recording {entry['file']}: {e}")
+                continue
+            del self.index[name]
+            total -= entry["bytes"]
+        metrics.set("recordings_archive_bytes", total)
+
+
+recording_archive = RecordingArchive()
@@ -0,0 +1,55 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from core.metrics import metrics
+
+# Imported first thing by main.py, so offsets are measured from (nearly) the
+# start of the process
+
+
+class StartupProfile:
+    # Import and initialization timings. Always recorded, printed line by line
+    # with --startup-profile
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.enabled = "--startup-profile" in sys.argv
+        self.steps = []  # (name, offset, seconds, thread name)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name):
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, begin)
+
+    def mark(self, name):
+        # Milestone without a duration, e.g. the hotkey becoming usable
+        self._record(name, None)
+        metrics.set("startup_seconds", time.perf_counter() - self.start, milestone=name)
+
+    def _record(self, name, begin):
+        end = time.perf_counter()
+        seconds = end - begin if begin is not None else None
+        thread = threading.current_thread().name
+        with self.lock:
+            self.steps.append((name, end - self.start, seconds, thread))
+        if self.enabled:
+            took = f"{seconds * 1000:8.1f} ms" if seconds is not None else "         --"
+            where = "" if thread == "MainThread" else f"  [{thread}]"
+            print(f"[startup] {(end - self.start) * 1000:8.1f} ms  {took}  {name}{where}")
+
+    def summary(self):
+        with self.lock:
+            return [
+                {"step": name, "at_ms": round(offset * 1000, 1), "took_ms": round(seconds * 1000, 1) if seconds is not None else None, "thread": thread}
+                for name, offset, seconds, thread in self.steps
+            ]
+
+
+startup_profile = StartupProfile()
+if startup_profile.enabled:
+    print("[startup]       at      took  step")
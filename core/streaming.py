@@ -0,0 +1,107 @@
+import queue
+import threading
+from config import config
+from core.transcriber import transcriber
+
+
+class SpeechChunker:
+    # Splits the growing recording into chunks that end on a pause in speech,
+    # so a chunk boundary never cuts a word in half. Works on sample offsets
+    # into the recorder's buffer, the audio itself is never copied here.
+    def __init__(self, fs):
+        self.fs = fs
+        self.start = 0
+        self.last_end = 0
+        self.silent_samples = 0
+        self.heard_speech = False
+
+    def feed(self, end, rms):
+        block = end - self.last_end
+        self.last_end = end
+
+        if rms >= config.stream_silence_rms:
+            self.heard_speech = True
+            self.silent_samples = 0
+        else:
+            self.silent_samples += block
+
+        samples = end - self.start
+        min_samples = int(config.stream_min_chunk_seconds * self.fs)
+        max_samples = int(config.stream_max_chunk_seconds * self.fs)
+        pause_samples = int(config.stream_pause_ms * self.fs / 1000)
+
+        if samples >= max_samples:
+            return self._cut(end)
+        if self.heard_speech and samples >= min_samples and self.silent_samples >= pause_samples:
+            return self._cut(end)
+        return None
+
+    def flush(self, end):
+        return self._cut(end)
+
+    def _cut(self, end):
+        # Chunks without any speech are dropped, there is nothing to decode
+        chunk = (self.start, end) if self.heard_speech and end > self.start else None
+        self.start = end
+        self.last_end = end
+        self.silent_samples = 0
+        self.heard_speech = False
+        return chunk
+
+
+class StreamingSession:
+    # Decodes completed chunks on a worker thread while recording continues.
+    # When the hotkey is released only the tail chunk is left to decode.
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.chunker = SpeechChunker(buffer.fs)
+        self.chunks = queue.Queue()
+        self.texts = []
+        self.error = None
+        self.on_text = None  # Optional callable(text) for every decoded chunk
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def feed(self, end, rms):
+        # Called from the audio callback, keep it cheap
+        chunk = self.chunker.feed(end, rms)
+        if chunk:
+            self.chunks.put(chunk)
+
+    def _run(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                break
+            if self.error:
+                continue
+            try:
+                audio = self.buffer.slice(*chunk)
+                # Give the model the previous text as context so sentences flow across chunks
+                prompt = " ".join(self.texts)[-200:] or None
+                text = transcriber.transcribe_chunk(audio, initial_prompt=prompt)
+                if text:
+                    print(f"Streamed chunk ({len(audio) / self.buffer.fs:.1f}s): {text[:50]}")
+                    self.texts.append(text)
+                    if self.on_text:
+                        self.on_text(text)
+            except Exception as e:
+                print(f"Error transcribing chunk: {e}")
+                self.error = e
+
+    def finish(self):
+        tail = self.chunker.flush(len(self.buffer))
+        if tail:
+            self.chunks.put(tail)
+        self.chunks.put(None)
+        self.thread.join()
+
+        if config.unload_model:
+            transcriber.unload_model()
+
+        if self.error:
+            raise self.error
+        return " ".join(self.texts).strip()
+
+    def abort(self):
+        self.chunks.put(None)
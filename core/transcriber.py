@@ -1,32 +1,211 @@
 import os
-from faster_whisper import WhisperModel
+import threading
+import time
+from dataclasses import dataclass, field
+import numpy as np
 from config import config
 from core.model_manager import model_manager
-import torch
+from core.model_cache import ModelCache, estimate_bytes
+from core.decoding import PROFILES, ProfileSelector
+from core.metrics import metrics
+from core.startup import startup_profile
+
+# faster_whisper pulls in ctranslate2, tokenizers, PyAV and onnxruntime, which
+# takes seconds on a cold start. It is imported on the first model load, off
+# the hotkey path. Set these beforehand to swap in another engine.
+WhisperModel = None
+BatchedInferencePipeline = None
+
+@dataclass
+class TranscriptionResult:
+    text: str = ""
+    segments: list = field(default_factory=list)  # [{"start", "end", "text"}]
+    language: str = None
+    audio_seconds: float = 0.0
+    decode_seconds: float = 0.0
+    profile: str = None
+    model: str = None
+    route: str = None  # Routing rule that picked the model: 'short', 'long', 'default' or 'off'
+
+def import_engine():
+    global WhisperModel, BatchedInferencePipeline
+    if WhisperModel is not None:
+        return
+    with startup_profile.step("import faster_whisper"):
+        from faster_whisper import WhisperModel as whisper_model
+        try:
+            from faster_whisper import BatchedInferencePipeline as batched_pipeline
+        except ImportError:
+            # faster-whisper < 1.1, long recordings fall back to sequential decoding
+            batched_pipeline = None
+    BatchedInferencePipeline = batched_pipeline
+    WhisperModel = whisper_model
+
+def cuda_available():
+    # CTranslate2's own device query, no torch needed
+    import ctranslate2
+    try:
+        return ctranslate2.get_cuda_device_count() > 0
+    except Exception:
+        return False
+
+def resolve_device(device):
+    if device == "auto":
+        return "cuda" if cuda_available() else "cpu"
+    return device
+
+def tuned_profile_key(model_size, device):
+    return f"{model_size}|{device}"
 
 class Transcriber:
     def __init__(self):
-        self.model = None
+        self.model = None  # WhisperModel in use, one of the models in self.cache
+        self.active = None  # ResidentModel wrapping self.model
         self.current_model_size = None
         self.current_device = None
+        self.cache = ModelCache()  # Other recently used models stay loaded for quick switching
+        # Serializes load/decode/unload between the hotkey path, the preload
+        # thread, the idle timer and the web API
+        self.lock = threading.RLock()
+        self.last_used = 0.0
+        self.idle_timer = None
+        self.profiles = ProfileSelector()
+        self.last_profile = None
+
+    def preload(self):
+        # Load and warm the model in the background so the first dictation
+        # doesn't pay for it
+        threading.Thread(target=self._preload, name="model-preload", daemon=True).start()
+
+    def _preload(self):
+        try:
+            with self.lock, startup_profile.step("model preload + warm-up"):
+                start = time.time()
+                self.load_model()
+                # One short decode to initialize kernels and allocator pools
+                segments, _ = self.model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1)
+                for _ in segments:
+                    pass
+                print(f"Model preloaded and warmed up in {time.time() - start:.2f}s")
+            self._touch()
+        except Exception as e:
+            print(f"Error preloading model: {e}")
+
+    def _touch(self):
+        # Restart the idle countdown after the model was used
+        self.last_used = time.time()
+        if self.active:
+            # The cache only sees a model when it's switched to, keep its
+            # idle time in resident_models() honest between switches
+            self.active.last_used = self.last_used
+        if self.idle_timer:
+            self.idle_timer.cancel()
+            self.idle_timer = None
+        if config.model_idle_timeout_minutes > 0 and self.model:
+            self.idle_timer = threading.Timer(config.model_idle_timeout_minutes * 60, self._on_idle)
+            self.idle_timer.daemon = True
+            self.idle_timer.start()
 
-    def load_model(self):
+    def _on_idle(self):
+        with self.lock:
+            idle = time.time() - self.last_used
+            if self.model and idle >= config.model_idle_timeout_minutes * 60:
+                print(f"Model idle for {idle / 60:.1f} minutes")
+                self.unload_model()
+
+    def route(self, speech_seconds):
+        # Short commands don't need the big model and long memos are worth the
+        # accurate one. Returns (model_size, rule).
+        if not config.model_routing or speech_seconds is None:
+            return config.model_size, "off"
+        # English-only models can't transcribe other languages or translate
+        needs_multilingual = config.language != "en" or config.translate_to_english
+        candidates = [
+            ("short", config.routing_short_model, speech_seconds <= config.routing_short_max_seconds),
+            ("long", config.routing_long_model,
+             config.routing_long_min_seconds > 0 and speech_seconds >= config.routing_long_min_seconds),
+        ]
+        for rule, model_size, matches in candidates:
+            if matches and model_size and not (needs_multilingual and model_size.endswith(".en")):
+                return model_size, rule
+        return config.model_size, "default"
+
+    def load_model(self, model_size=None):
+        with self.lock:
+            self._load_model(model_size)
+
+    def _load_model(self, model_size=None):
+        model_size = model_size or config.model_size
         # Check if we need to reload (Size changed OR Device changed)
         if (self.model and 
-            self.current_model_size == config.model_size and 
+            self.current_model_size == model_size and 
             self.current_device == config.device):
             return
         
-        # If reloading, unload first to be safe
-        if self.model:
-            self.unload_model()
+        # Switching models: the old one stays in the cache unless it has to
+        # make room, so switching back is instant
+        self.model = None
+        self.active = None
+
+        device, compute_type, cpu_threads = self._load_settings(model_size)
+        key = (model_size, device, compute_type)
+        entry = self.cache.get(key)
+        if entry:
+            print(f"Using resident model {model_size} on {device} with {compute_type}")
+            self.cache.make_room(device, 0, keep=entry)
+        else:
+            import_engine()
+            model_path = model_manager.get_model_path(model_size)
+            size_bytes = self._estimate_size(model_size, model_path, compute_type)
+            if self.cache.make_room(device, size_bytes):
+                import gc
+                gc.collect()
+            
+            print(f"Loading model {model_size} on {device} with {compute_type}...")
+            
+            try:
+                model = WhisperModel(
+                    model_path, 
+                    device=device, 
+                    compute_type=compute_type,
+                    cpu_threads=cpu_threads,
+                    # Decodes never overlap (self.lock, one queue worker), a
+                    # second worker would only hold another copy of the state
+                    num_workers=1
+                )
+                print("Model loaded successfully.")
+            except Exception as e:
+                print(f"Error loading model: {e}")
+                raise
+            entry = self.cache.put(key, model, size_bytes)
+
+        self.active = entry
+        self.model = entry.model
+        self.current_model_size = model_size
+        self.current_device = config.device # Track the configured device, not the resolved one
+
+    @staticmethod
+    def _estimate_size(model_size, model_path, compute_type):
+        indexed = model_manager.index.get(model_size)
+        if indexed:
+            return estimate_bytes(indexed["model_bin_bytes"], indexed.get("quantization"), compute_type)
+        model_bin = os.path.join(model_path, "model.bin")
+        if os.path.isfile(model_bin):
+            return estimate_bytes(os.path.getsize(model_bin), None, compute_type)
+        return 0
+
+    def resident_models(self):
+        return self.cache.resident(self.active.key if self.active else None)
+
+    def _load_settings(self, model_size):
+        device = resolve_device(config.device)
+
+        # Settings measured by the auto-tuner for this model on this host win
+        tuned = config.tuned_profiles.get(tuned_profile_key(model_size, device))
+        if tuned:
+            print(f"Using auto-tuned settings: {tuned}")
+            return device, tuned["compute_type"], tuned.get("cpu_threads", 0)
 
-        model_path = model_manager.get_model_path(config.model_size)
-        
-        device = config.device
-        if device == "auto":
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-        
         compute_type = config.compute_type
         
         # Smart defaults for performance
@@ -38,61 +217,151 @@ class Transcriber:
         if device == "cpu":
             compute_type = "int8" # Force int8 on CPU for speed
         
-        print(f"Loading model {config.model_size} on {device} with {compute_type}...")
-        
-        try:
-            self.model = WhisperModel(
-                model_path, 
-                device=device, 
-                compute_type=compute_type
-            )
-            self.current_model_size = config.model_size
-            self.current_device = config.device # Track the configured device, not the resolved one
-            print("Model loaded successfully.")
-        except Exception as e:
-            print(f"Error loading model: {e}")
-            raise
+        return device, compute_type, 0
 
     def unload_model(self):
-        if self.model:
-            print("Unloading model to free VRAM...")
-            del self.model
+        with self.lock:
+            self._unload_model()
+
+    def _unload_model(self):
+        if self.model or self.cache.entries:
+            print("Unloading models to free memory...")
             self.model = None
+            self.active = None
+            self.cache.clear()
             self.current_model_size = None
             self.current_device = None
+            # CTranslate2 releases the model's host and device memory when
+            # it is garbage collected
             import gc
             gc.collect()
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
 
-    def transcribe(self, audio_path):
-        if not self.model:
-            self.load_model()
-        
-        if not os.path.exists(audio_path):
-            return ""
+    def transcribe(self, audio, cancel_event=None, on_segment=None):
+        return self.transcribe_detailed(audio, cancel_event=cancel_event, on_segment=on_segment).text
+
+    def transcribe_detailed(self, audio, cancel_event=None, on_segment=None, speech_seconds=None):
+        # `audio` is the recorder's 16 kHz mono float32 buffer. It goes to the
+        # model as-is, so there is no temp file and no ffmpeg decode. A file
+        # path is still accepted for recordings on disk.
+        if isinstance(audio, str):
+            if not os.path.exists(audio):
+                return TranscriptionResult()
+            print(f"Transcribing {audio}...")
+        elif audio is None or len(audio) == 0:
+            return TranscriptionResult()
+        else:
+            print(f"Transcribing {len(audio) / 16000:.2f}s of audio...")
 
-        print(f"Transcribing {audio_path}...")
         try:
+            return self._decode(audio, cancel_event=cancel_event, on_segment=on_segment, speech_seconds=speech_seconds)
+        finally:
+            if config.unload_model:
+                self.unload_model()
+            else:
+                self._touch()
+
+    def transcribe_chunk(self, audio, initial_prompt=None):
+        # Used by streaming sessions. The model stays loaded between chunks,
+        # the session takes care of unloading once the recording is finished.
+        try:
+            # All chunks of a dictation go to the configured model, routing
+            # them by chunk length would mix models mid-sentence
+            return self._decode(audio, initial_prompt=initial_prompt, route=False).text
+        finally:
+            self._touch()
+
+    def _decode(self, audio, initial_prompt=None, cancel_event=None, on_segment=None, speech_seconds=None, route=True):
+        # on_segment(segment_dict) is called as each segment comes out of the
+        # decoder, so callers can show partial text before the whole clip is done.
+        # speech_seconds (from the VAD) routes better than the raw length.
+        audio_seconds = None if isinstance(audio, str) else len(audio) / 16000
+        if route:
+            model_size, rule = self.route(speech_seconds if speech_seconds is not None else audio_seconds)
+        else:
+            model_size, rule = config.model_size, "off"
+        with self.lock:
+            # Reloads if the routed model or the device changed since the last call
+            self._load_model(model_size)
+
             # Determine task based on config
             task = "transcribe"
             if config.translate_to_english:
                 task = "translate"
             
-            segments, info = self.model.transcribe(
-                audio_path, 
-                beam_size=5,
-                language=config.language if config.language != "auto" else None,
-                task=task
-            )
+            # Pick beam size/temperature fallback for this utterance
+            batched = self._use_batched(audio_seconds)
+            model_key = f"{self.current_model_size}|{self.current_device}"
+            if batched:
+                model_key += "|batched"
+            profile = self.profiles.choose(model_key, audio_seconds)
+            self.last_profile = profile
+            
+            language = config.language if config.language != "auto" else None
+            start = time.time()
+            if batched:
+                # Long recordings: VAD splits the audio into speech segments and
+                # those are decoded batch_size at a time instead of one 30s window after another
+                if self.active.batched is None:
+                    self.active.batched = BatchedInferencePipeline(model=self.model)
+                options = dict(PROFILES[profile])
+                options.pop("condition_on_previous_text")  # Segments are decoded independently
+                segments, info = self.active.batched.transcribe(
+                    audio,
+                    language=language,
+                    task=task,
+                    batch_size=config.batch_size,
+                    vad_filter=True,
+                    **options
+                )
+            else:
+                segments, info = self.model.transcribe(
+                    audio, 
+                    language=language,
+                    task=task,
+                    initial_prompt=initial_prompt,
+                    **PROFILES[profile]
+                )
             
+            # Segments are decoded lazily, stopping here skips the rest of the audio
             text = ""
+            decoded = []
+            cancelled = False
             for segment in segments:
+                if cancel_event and cancel_event.is_set():
+                    cancelled = True
+                    break
                 text += segment.text
+                decoded.append({"start": round(segment.start, 2), "end": round(segment.end, 2), "text": segment.text.strip()})
+                if on_segment:
+                    on_segment(decoded[-1])
             
-            return text.strip()
-        finally:
-            if config.unload_model:
-                self.unload_model()
+            decode_seconds = time.time() - start
+            if not cancelled:
+                self.profiles.record(model_key, profile, info.duration, decode_seconds)
+                metrics.inc("audio_seconds_total", info.duration)
+                if info.duration:
+                    metrics.observe("realtime_factor", decode_seconds / info.duration, model=self.current_model_size)
+                if rule != "off":
+                    metrics.observe("routed_decode_seconds", decode_seconds, model=model_size, route=rule)
+                print(f"Decoded {info.duration:.2f}s with {model_size} ({rule} route), '{profile}' profile in {decode_seconds:.2f}s (RTF {decode_seconds / max(info.duration, 0.01):.2f})")
+            
+            return TranscriptionResult(
+                text=text.strip(),
+                segments=decoded,
+                language=info.language,
+                audio_seconds=info.duration,
+                decode_seconds=decode_seconds,
+                profile=profile,
+                model=model_size,
+                route=rule
+            )
+
+    def _use_batched(self, audio_seconds):
+        return (
+            BatchedInferencePipeline is not None
+            and config.batched_min_seconds > 0
+            and audio_seconds is not None
+            and audio_seconds >= config.batched_min_seconds
+        )
 
 transcriber = Transcriber()
@@ -0,0 +1,55 @@
+import numpy as np
+from dataclasses import dataclass
+from config import config
+
+FRAME_MS = 30
+# The speech threshold follows the noise floor of the recording but stays
+# within these bounds (dBFS), so an all-speech or very noisy recording
+# can't push it out of a sensible range.
+NOISE_MARGIN_DB = 12.0
+MAX_THRESHOLD_DB = -30.0
+
+
+@dataclass
+class VadResult:
+    audio: np.ndarray
+    has_speech: bool
+    total_seconds: float
+    speech_seconds: float
+
+    @property
+    def dropped_seconds(self):
+        return self.total_seconds - self.speech_seconds
+
+
+def frame_levels_db(audio, frame_size):
+    # RMS level of every full frame in dBFS, computed in one pass
+    count = len(audio) // frame_size
+    if count == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = audio[:count * frame_size].reshape(count, frame_size)
+    power = np.einsum("ij,ij->i", frames, frames) / frame_size
+    return 10.0 * np.log10(power + 1e-12)
+
+
+def trim_silence(audio, fs=16000):
+    # Returns the audio with leading and trailing silence removed (a view,
+    # nothing is copied) and whether there is any speech worth decoding.
+    total = len(audio) / fs
+    frame_size = int(fs * FRAME_MS / 1000)
+    levels = frame_levels_db(audio, frame_size)
+    if len(levels) == 0:
+        return VadResult(audio[:0], False, total, 0.0)
+
+    noise_floor = np.percentile(levels, 10)
+    threshold = min(max(config.vad_threshold_db, noise_floor + NOISE_MARGIN_DB), MAX_THRESHOLD_DB)
+    voiced = np.flatnonzero(levels > threshold)
+
+    if len(voiced) * FRAME_MS < config.vad_min_speech_ms:
+        return VadResult(audio[:0], False, total, 0.0)
+
+    pad = int(config.vad_padding_ms / FRAME_MS)
+    start = max(0, voiced[0] - pad) * frame_size
+    end = min(len(audio), (voiced[-1] + 1 + pad) * frame_size)
+    trimmed = audio[start:end]
+    return VadResult(trimmed, True, total, len(trimmed) / fs)
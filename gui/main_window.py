@@ -270,8 +270,8 @@ class MainWindow(QMainWindow):
         config.gemini_model = self.ai_model_combo.currentText().strip()
         config.save()
         # Re-configure formatter
-        from core.gemini_formatter import gemini_formatter
-        gemini_formatter.configure()
+        from core.formatter import text_formatter
+        text_formatter.configure()
 
 
 
@@ -50,64 +50,6 @@ echo.
 echo Upgrading pip...
 python -m pip install --upgrade pip
 
-REM GPU Detection Logic for RTX 50 Series (Blackwell)
-echo.
-echo ===================================================
-echo Checking for NVIDIA GPU and CUDA version...
-echo ===================================================
-
-set "RTX50_DETECTED=0"
-
-REM Check using nvidia-smi if available
-where nvidia-smi >nul 2>&1
-if %errorlevel% equ 0 (
-    REM Check Compute Capability (sm_120 is reported as 12.0)
-    for /f "tokens=*" %%i in ('nvidia-smi --query-gpu=compute_cap --format=csv^,noheader') do (
-        set "COMPUTE_CAP=%%i"
-        echo Detected Compute Capability: !COMPUTE_CAP!
-
-        REM Check if starts with 12.
-        echo !COMPUTE_CAP! | findstr "^12\." >nul
-        if !errorlevel! equ 0 (
-            echo [!] Compute Capability 12.x detected ^(Blackwell/RTX 50^).
-            set RTX50_DETECTED=1
-        )
-    )
-
-    REM Check CUDA Version (Fallback/Confirmation)
-    nvidia-smi | findstr "CUDA Version: 12.8" >nul
-    if !errorlevel! equ 0 set RTX50_DETECTED=1
-
-    nvidia-smi | findstr "CUDA Version: 12.9" >nul
-    if !errorlevel! equ 0 set RTX50_DETECTED=1
-
-    nvidia-smi | findstr "CUDA Version: 13" >nul
-    if !errorlevel! equ 0 set RTX50_DETECTED=1
-
-) else (
-    echo nvidia-smi not found. Assuming standard installation.
-)
-
-echo.
-echo ===================================================
-echo Installing PyTorch
-echo ===================================================
-
-if "!RTX50_DETECTED!"=="1" (
-    echo.
-    echo [!] RTX 50 Series / CUDA 12.8+ Detected!
-    echo [!] Installing PyTorch Nightly for sm_120 support...
-    echo [!] Command: pip install --pre torch torchvision torchaudio --index-url https://download.pytorch.org/whl/nightly/cu128
-    echo.
-    python -m pip install --pre torch torchvision torchaudio --index-url https://download.pytorch.org/whl/nightly/cu128
-) else (
-    echo.
-    echo [i] Standard GPU or CPU detected.
-    echo [i] Installing stable PyTorch with CUDA 12.1...
-    echo.
-    python -m pip install torch torchvision torchaudio --index-url https://download.pytorch.org/whl/cu121
-)
-
 echo.
 echo ===================================================
 echo Installing Core Dependencies
@@ -121,11 +63,12 @@ python -m pip install keyboard
 python -m pip install pywin32
 python -m pip install scipy
 python -m pip install pyinstaller
-python -m pip install google-generativeai
+python -m pip install httpx
 python -m pip install fastapi
 python -m pip install uvicorn
 python -m pip install jinja2
 python -m pip install python-multipart
+python -m pip install soundfile
 
 echo.
 echo ===================================================
@@ -2,87 +2,127 @@ import os
 import sys
 import warnings
 import webbrowser
+import time
+import threading
+import asyncio
+
+from core.startup import startup_profile
 
 # Suppress annoying pkg_resources deprecation warning
 warnings.filterwarnings("ignore", category=UserWarning, module="ctranslate2")
 warnings.filterwarnings("ignore", message=".*pkg_resources is deprecated.*")
 
-# Pre-load torch
-import torch
-import time
-import threading
-import uvicorn
-import asyncio
-
 # Enable fast downloads
 os.environ["HF_HUB_ENABLE_HF_TRANSFER"] = "1"
 
-import keyboard
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import QObject, pyqtSlot, pyqtSignal
+# Only what the tray and the hotkey need is imported up front. faster_whisper,
+# uvicorn/FastAPI and the formatter's HTTP client are imported on background threads
+# once the hotkey is live (see start_background_services).
+with startup_profile.step("import PyQt6"):
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QObject, pyqtSlot, pyqtSignal
 
-from config import config
-from core.audio_recorder import AudioRecorder
-from core.transcriber import transcriber
-from core.hotkey_manager import hotkey_manager
-from core.gemini_formatter import gemini_formatter
-from gui.system_tray import SystemTray
-from gui.widgets import VisualizerOverlay
-import shutil
-from datetime import datetime
+with startup_profile.step("import keyboard + sounddevice"):
+    import keyboard
+    from core.audio_recorder import AudioRecorder
+    from core.hotkey_manager import hotkey_manager
 
-# Web Server Import
-from web_ui import server
+with startup_profile.step("import core"):
+    from config import config
+    from core.transcriber import transcriber
+    from core.formatter import text_formatter
+    from core.streaming import StreamingSession
+    from core.vad import trim_silence
+    from core.job_queue import Job, JobCancelled, TranscriptionQueue
+    from core.metrics import metrics
+    from core.history import history_store
+    from core.recording_archive import recording_archive
+    from gui.system_tray import SystemTray
+    from gui.widgets import VisualizerOverlay
 
 class ApplicationController(QObject):
     # Signals must be defined at class level
     paste_request = pyqtSignal(str)
     toggle_request = pyqtSignal()
+    reconfigure_request = pyqtSignal()
 
     def __init__(self):
         super().__init__()
-        self.app = QApplication(sys.argv)
-        self.app.setQuitOnLastWindowClosed(False)
+        with startup_profile.step("QApplication"):
+            self.app = QApplication(sys.argv)
+            self.app.setQuitOnLastWindowClosed(False)
         
         # Logic State
         self.is_recording = False
         self.status = "Ready"
         self.last_action = "Initialized"
         self.last_transcription = "-"
+        self.stream_session = None
+        self.recording_started_at = None
+        self.server = None  # web_ui.server, set once the web server thread has imported it
         
-        # Initialize formatter
-        gemini_formatter.configure()
+        # Single worker that runs recordings through the model in order
+        self.jobs = TranscriptionQueue(self.process_job)
         
         # GUI Elements (Tray + Overlay only)
-        self.tray = SystemTray(None) # No main window parent
-        self.tray.activated.connect(self.on_tray_click)
-        
-        self.overlay = VisualizerOverlay()
+        with startup_profile.step("tray + overlay"):
+            self.tray = SystemTray(None) # No main window parent
+            self.tray.activated.connect(self.on_tray_click)
+            
+            self.overlay = VisualizerOverlay()
         
-        self.recorder = AudioRecorder()
-        self.recorder.level_updated.connect(self.overlay.set_level)
+        with startup_profile.step("audio recorder"):
+            self.recorder = AudioRecorder()
+            self.recorder.level_updated.connect(self.overlay.set_level)
+            if config.keep_mic_open:
+                self.recorder.open_stream()
         
         # Connect signals for thread safety
         hotkey_manager.recording_toggled.connect(self.request_toggle_recording)
+        hotkey_manager.cancel_requested.connect(self.cancel_jobs)
         self.toggle_request.connect(self.toggle_recording)
+        self.reconfigure_request.connect(self.recorder.reconfigure)
         self.paste_request.connect(self.handle_paste_request)
         
         # Start hotkey listener
-        hotkey_manager.start()
+        with startup_profile.step("hotkey listener"):
+            hotkey_manager.start()
+        startup_profile.mark("hotkey ready")
         
-        # Inject self into server
-        server.controller = self
+        self.start_background_services()
+        
+        # Optional: Open browser on start
+        # webbrowser.open("http://127.0.0.1:8000")
 
+    def start_background_services(self):
+        # Everything here is slow to import or initialize and nothing on the
+        # hotkey path waits for it. A dictation that starts before the model is
+        # warm just loads it on demand.
+        
         # Start Web Server
-        self.server_thread = threading.Thread(target=self.run_server, daemon=True)
+        self.server_thread = threading.Thread(target=self.run_server, name="web-server", daemon=True)
         self.server_thread.start()
         
-        print("Web Server started at http://127.0.0.1:8000")
+        # Initialize formatter
+        threading.Thread(target=self.configure_formatter, name="formatter", daemon=True).start()
         
-        # Optional: Open browser on start
-        # webbrowser.open("http://127.0.0.1:8000")
+        # Warm the model up while the user is still getting ready to talk
+        if config.preload_model and not config.unload_model:
+            transcriber.preload()
+
+    def configure_formatter(self):
+        with startup_profile.step("formatter client"):
+            text_formatter.configure()
 
     def run_server(self):
+        with startup_profile.step("import web server"):
+            import uvicorn
+            from web_ui import server
+        
+        # Inject self into server
+        server.controller = self
+        self.server = server
+        
         # Hardcore suppression handler
         def exception_handler(loop, context):
             exc = context.get("exception")
@@ -96,7 +136,16 @@ class ApplicationController(QObject):
             
             config = uvicorn.Config(server.app, host="0.0.0.0", port=8000, log_level="critical", loop="asyncio")
             server_instance = uvicorn.Server(config)
-            await server_instance.serve()
+            
+            async def report_ready():
+                while not server_instance.started:
+                    if server_instance.should_exit:
+                        return
+                    await asyncio.sleep(0.01)
+                startup_profile.mark("web server ready")
+                print("Web Server started at http://127.0.0.1:8000")
+            
+            await asyncio.gather(server_instance.serve(), report_ready())
 
         # Run the async serve function in this thread's event loop
         if sys.platform == 'win32':
@@ -104,6 +153,35 @@ class ApplicationController(QObject):
         
         asyncio.run(serve())
 
+    def status_payload(self):
+        return {
+            "is_recording": self.is_recording,
+            "status_text": self.status,
+            "last_action": self.last_action,
+            "last_transcription": self.last_transcription,
+            "queue": self.jobs.stats(),
+            "models": transcriber.resident_models()
+        }
+
+    def set_state(self, status=None, last_action=None):
+        # Every state change goes out to the dashboard over the websocket
+        if status is not None:
+            self.status = status
+        if last_action is not None:
+            self.last_action = last_action
+        self.publish("status", self.status_payload())
+
+    def publish(self, event, payload):
+        if self.server:
+            self.server.broadcast_update({"type": event, "payload": payload})
+
+    def publish_queue(self, job=None):
+        payload = self.jobs.stats()
+        if job is not None:
+            payload["job_id"] = job.id
+            payload["position"] = self.jobs.position(job)
+        self.publish("queue", payload)
+
     def on_tray_click(self, reason):
         # Open dashboard on click
         webbrowser.open("http://127.0.0.1:8000")
@@ -112,6 +190,11 @@ class ApplicationController(QObject):
     def request_toggle_recording(self):
         self.toggle_request.emit()
 
+    def request_reconfigure_recorder(self):
+        # The recorder's stream is only opened and closed on the Main Thread,
+        # where start()/stop() run, never on the server's event loop
+        self.reconfigure_request.emit()
+
     @pyqtSlot()
     def toggle_recording(self):
         # This now runs on the Main Thread
@@ -122,12 +205,22 @@ class ApplicationController(QObject):
 
     def start_recording(self):
         self.is_recording = True
-        self.status = "Recording..."
-        self.last_action = "Started Recording"
+        self.set_state("Recording...", "Started Recording")
         print(f"State: {self.status}")
         
+        if config.cancel_on_new_recording:
+            self.jobs.cancel_all()
+        
+        self.recording_started_at = time.perf_counter()
         self.recorder.start()
         
+        if config.transcription_mode == "streaming":
+            # Chunk offsets are counted from the start of the buffer, so
+            # attaching right after start() doesn't lose any audio
+            self.stream_session = StreamingSession(self.recorder.buffer)
+            self.stream_session.on_text = lambda text: self.publish("partial", {"text": text})
+            self.recorder.stream_sink = self.stream_session.feed
+        
         # Show overlay (Safe: Main Thread)
         screen_geo = self.app.primaryScreen().geometry()
         self.overlay.move(
@@ -138,81 +231,164 @@ class ApplicationController(QObject):
 
     def stop_recording(self):
         self.is_recording = False
-        self.status = "Processing..."
-        self.last_action = "Stopped Recording"
+        self.set_state("Processing...", "Stopped Recording")
         print(f"State: {self.status}")
         self.overlay.hide()
         
-        # Stop recorder and get audio path
-        audio_path = self.recorder.stop()
+        # Stop recorder and get the captured audio buffer
+        timings = {}
+        if self.recording_started_at is not None:
+            timings["capture"] = time.perf_counter() - self.recording_started_at
+            metrics.observe("stage_seconds", timings["capture"], stage="capture")
+        with metrics.time_stage("finalize", timings):
+            audio = self.recorder.stop()
+        
+        session = self.stream_session
+        self.stream_session = None
+        self.recorder.stream_sink = None
         
-        if audio_path:
-            threading.Thread(target=self.process_audio, args=(audio_path,)).start()
+        if audio is not None:
+            job = Job(audio, session)
+            job.timings.update(timings)
+            if config.save_recordings:
+                # Only queued here, encoding and disk writes happen on the archive's own thread
+                job.recording = recording_archive.submit(audio, self.recorder.fs)
+            if not self.jobs.submit(job):
+                metrics.inc("jobs_total", status="rejected")
+                # Backpressure: don't pile up work the user will be waiting on for ages
+                if session:
+                    session.abort()
+                self.set_state("Ready", f"Busy: {config.max_queued_jobs} recordings already queued, dropped this one")
+                print(self.last_action)
+            else:
+                self.publish_queue(job)
+        elif session:
+            session.abort()
 
-    def process_audio(self, audio_path):
-        start_time = time.time()
+    def cancel_jobs(self):
+        if self.jobs.cancel_all():
+            self.set_state("Ready", "Transcription cancelled")
+
+    def process_job(self, job):
+        # Runs on the queue's worker thread
+        audio = job.audio
+        session = job.session
+        start_time = job.submitted_at
+        metrics.observe("stage_seconds", job.wait_seconds, stage="queue_wait")
+        job.timings["queue_wait"] = job.wait_seconds
+        self.publish_queue(job)
+        speech_seconds = len(audio) / self.recorder.fs
+        raw_text = ""
         try:
-            self.status = "Transcribing..."
+            if config.vad_enabled:
+                # Cheap energy gate: trims silence at both ends and skips the model for empty recordings
+                with metrics.time_stage("vad", job.timings):
+                    vad = trim_silence(audio, self.recorder.fs)
+                print(f"VAD: kept {vad.speech_seconds:.2f}s, dropped {vad.dropped_seconds:.2f}s of silence")
+                if not vad.has_speech:
+                    if session:
+                        session.abort()
+                    self.set_state("Ready", f"No speech detected ({vad.dropped_seconds:.1f}s skipped)")
+                    metrics.inc("jobs_total", status="no_speech")
+                    return
+                audio = vad.audio
+                speech_seconds = vad.speech_seconds
+            
+            self.set_state("Transcribing...")
             
-            text = transcriber.transcribe(audio_path)
+            if session:
+                # Most of the audio was decoded while recording, only the tail is left
+                job.model, job.route = config.model_size, "streaming"
+                with metrics.time_stage("decode", job.timings):
+                    text = session.finish()
+            else:
+                # Short phrases can go to a smaller model, long memos to a bigger one
+                job.model, job.route = transcriber.route(speech_seconds)
+                with metrics.time_stage("model_load", job.timings):
+                    transcriber.load_model(job.model)
+                with metrics.time_stage("decode", job.timings):
+                    text = transcriber.transcribe_detailed(
+                        audio,
+                        cancel_event=job.cancel_event,
+                        on_segment=lambda segment: self.publish("partial", {"job_id": job.id, **segment}),
+                        speech_seconds=speech_seconds
+                    ).text
+            print(f"Job {job.id}: {speech_seconds:.1f}s of speech, {job.route} route -> {job.model}")
+            raw_text = text or ""
+            job.check()
             
             if text:
-                self.status = "Formatting..."
-                formatted_text = gemini_formatter.format_text(text)
-                
-                if formatted_text == text:
-                    text = self.smart_format(text)
-                else:
-                    text = formatted_text
+                self.set_state("Formatting...")
+                # The LLM backend for longer dictations, the local rules for
+                # short ones and whenever the backend is off, failing or late
+                with metrics.time_stage("format", job.timings):
+                    text = text_formatter.format_text(text)
+                job.check()
 
                 duration = time.time() - start_time
                 
                 self.last_transcription = text
-                self.last_action = f"Transcribed ({duration:.2f}s)"
-                self.status = "Ready"
+                history_id = self.record_history(job, raw_text, text, speech_seconds, "done")
+                self.publish("final", {
+                    "job_id": job.id,
+                    "history_id": history_id,
+                    "text": text,
+                    "seconds": round(duration, 2),
+                    "model": job.model,
+                    "route": job.route,
+                    "timings_ms": {stage: round(t * 1000, 1) for stage, t in job.timings.items()}
+                })
+                self.set_state("Ready", f"Transcribed ({duration:.2f}s)")
                 
                 # Emit signal to paste on main thread
                 self.paste_request.emit(text)
+                metrics.inc("jobs_total", status="done")
             else:
-                 self.status = "Ready"
-                 self.last_action = "No speech detected"
+                 self.set_state("Ready", "No speech detected")
+                 metrics.inc("jobs_total", status="no_speech")
             
+        except JobCancelled:
+            # Kept with whatever was decoded before the cancel
+            self.record_history(job, raw_text, "", speech_seconds, "cancelled")
+            self.set_state("Ready", "Transcription cancelled")
+            metrics.inc("jobs_total", status="cancelled")
+            raise
         except Exception as e:
-            self.status = "Error"
-            self.last_action = f"Error: {str(e)[:50]}"
+            self.record_history(job, raw_text, "", speech_seconds, "error")
+            metrics.inc("jobs_total", status="error")
+            self.set_state("Error", f"Error: {str(e)[:50]}")
             print(f"Error: {e}")
-        finally:
-            if os.path.exists(audio_path):
-                if config.save_recordings:
-                    recordings_dir = os.path.join(os.getcwd(), "recordings")
-                    os.makedirs(recordings_dir, exist_ok=True)
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    new_path = os.path.join(recordings_dir, f"recording_{timestamp}.wav")
-                    shutil.move(audio_path, new_path)
-                else:
-                    os.remove(audio_path)
-
-    def smart_format(self, text):
-        text = text.strip()
-        if text and text[0].islower():
-            text = text[0].upper() + text[1:]
-        return text
+
+    def record_history(self, job, raw_text, text, speech_seconds, status):
+        history_id = history_store.append(
+            job, raw_text, text,
+            audio_seconds=len(job.audio) / self.recorder.fs,
+            speech_seconds=speech_seconds,
+            status=status
+        )
+        recording_archive.link(job.recording, history_id)
+        return history_id
 
     @pyqtSlot(str)
     def handle_paste_request(self, text):
         # This runs on Main Thread - Safe for Clipboard/COM
-        try:
-            clipboard = self.app.clipboard()
-            clipboard.setText(text)
-            time.sleep(0.1)
-            keyboard.send('ctrl+v')
-        except Exception as e:
-            print(f"Paste Error: {e}")
+        with metrics.time_stage("paste"):
             try:
-                keyboard.write(text)
-            except:
-                pass
+                clipboard = self.app.clipboard()
+                clipboard.setText(text)
+                time.sleep(0.1)
+                keyboard.send('ctrl+v')
+            except Exception as e:
+                print(f"Paste Error: {e}")
+                try:
+                    keyboard.write(text)
+                except:
+                    pass
     def run(self):
+        # The history writer and the archive encoder are daemon threads, let
+        # them finish what is queued
+        self.app.aboutToQuit.connect(history_store.flush)
+        self.app.aboutToQuit.connect(recording_archive.flush)
         sys.exit(self.app.exec())
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+import asyncio
+import socket
+import time
+
+import httpx
+import pytest
+
+from benchmarks.fakes import FakeFormatterServer
+from config import config
+from core.formatter import TextFormatter
+from core.formatter_backends import FormatterError, GeminiBackend, OpenAIBackend
+
+TEXT = "this is a longer sentence that goes to the backend for formatting"
+EXPECTED = "This is a longer sentence that goes to the backend for formatting."
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeFormatterServer()
+    monkeypatch.setattr(config, "gemini_api_key", "test")
+    monkeypatch.setattr(config, "gemini_base_url", server.gemini_url)
+    monkeypatch.setattr(config, "openai_base_url", server.openai_url)
+    monkeypatch.setattr(config, "openai_stream", True)
+    monkeypatch.setattr(config, "formatter_retries", 1)
+    monkeypatch.setattr(config, "formatter_connect_timeout", 1.0)
+    monkeypatch.setattr(config, "formatter_read_timeout", 2.0)
+    monkeypatch.setattr(config, "format_budget_ms", 0)
+    monkeypatch.setattr(config, "format_cache_enabled", False)
+    monkeypatch.setattr(config, "local_format_max_words", 0)
+    yield server
+    server.stop()
+
+
+def configured(backend_class):
+    backend = backend_class()
+    assert backend.configure()
+    return backend
+
+
+def refused_url():
+    # A port that was just free, nothing listens on it
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}/v1"
+
+
+@pytest.mark.parametrize("backend_class", [GeminiBackend, OpenAIBackend])
+def test_retries_once_on_503(server, backend_class):
+    backend = configured(backend_class)
+    server.fail_next = 1
+    assert backend.generate(TEXT) == EXPECTED
+    assert server.calls == 2
+
+
+@pytest.mark.parametrize("backend_class", [GeminiBackend, OpenAIBackend])
+def test_gives_up_after_the_retry(server, backend_class):
+    backend = configured(backend_class)
+    server.fail_next = 2
+    with pytest.raises(FormatterError) as error:
+        backend.generate(TEXT)
+    assert error.value.status == 503
+    assert server.calls == 2
+
+
+@pytest.mark.parametrize("backend_class", [GeminiBackend, OpenAIBackend])
+def test_no_retry_on_400(server, backend_class):
+    backend = configured(backend_class)
+    server.fail_next = 1
+    server.fail_status = 400
+    with pytest.raises(FormatterError) as error:
+        backend.generate(TEXT)
+    assert error.value.status == 400
+    assert server.calls == 1
+
+
+def test_read_timeout_is_not_retried(server, monkeypatch):
+    monkeypatch.setattr(config, "formatter_read_timeout", 0.2)
+    server.latency = 0.5
+    backend = configured(GeminiBackend)
+    with pytest.raises(httpx.ReadTimeout):
+        backend.generate(TEXT)
+    assert server.calls == 1
+
+
+@pytest.mark.parametrize("backend_class", [GeminiBackend, OpenAIBackend])
+def test_reuses_one_connection(server, backend_class):
+    backend = configured(backend_class)
+    for _ in range(5):
+        assert backend.generate(TEXT) == EXPECTED
+    assert server.calls == 5
+    assert len(server.connections) == 1
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_openai_stream_and_plain_responses(server, monkeypatch, stream):
+    monkeypatch.setattr(config, "openai_stream", stream)
+    backend = configured(OpenAIBackend)
+    # Streamed answers end with [DONE], which must not leak into the text
+    assert backend.generate(TEXT) == EXPECTED
+    assert backend.generate(TEXT) == EXPECTED
+    assert len(server.connections) == 1
+
+
+def test_falls_back_to_local_rules_when_refused(server, monkeypatch):
+    monkeypatch.setattr(config, "formatter_backend", "openai")
+    monkeypatch.setattr(config, "openai_base_url", refused_url())
+    formatter = TextFormatter()
+    assert formatter.format_text(TEXT) == EXPECTED  # From the local formatter
+    assert server.calls == 0
+
+
+def test_falls_back_when_over_budget(server, monkeypatch):
+    monkeypatch.setattr(config, "format_budget_ms", 100)
+    server.latency = 0.5
+    formatter = TextFormatter()
+    start = time.perf_counter()
+    assert formatter.format_text(TEXT) == EXPECTED  # From the local formatter
+    assert time.perf_counter() - start < 0.4
+    formatter.pool.shutdown(wait=True)  # Let the late call finish before the server stops
+    assert server.calls == 1
+
+
+@pytest.mark.parametrize("backend_name", ["gemini", "openai"])
+def test_format_text_async(server, monkeypatch, backend_name):
+    monkeypatch.setattr(config, "formatter_backend", backend_name)
+    formatter = TextFormatter()
+
+    async def run():
+        return [await formatter.format_text_async(TEXT) for _ in range(3)]
+
+    assert asyncio.run(run()) == [EXPECTED] * 3
+    assert server.calls == 3
+    assert len(server.connections) == 1
@@ -0,0 +1,29 @@
+import pytest
+
+from core.local_formatter import local_formatter
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("ok", "Ok."),
+    ("what time is the meeting tomorrow", "What time is the meeting tomorrow?"),
+    ("it went up five percent last quarter", "It went up 5% last quarter."),
+    ("we need two hundred and fifty chairs", "We need 250 chairs."),
+    ("call me back when you get a chance , i'm in the office", "Call me back when you get a chance, I'm in the office."),
+    ("first, buy milk. second, call mom. finally, sleep", "- Buy milk\n- Call mom\n- Sleep"),
+    # Whisper sometimes puts a space before punctuation
+    ("first , we go home . second , we eat", "- We go home\n- We eat"),
+    ("agenda : first , eggs , second , milk", "Agenda:\n- Eggs\n- Milk"),
+    ("at first i thought second hand was fine", "At first I thought second hand was fine."),
+])
+def test_format_text(raw, expected):
+    assert local_formatter.format_text(raw) == expected
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("does it work for you mr. smith", "Does it work for you mr. smith?"),
+    ("i.e. no", "i.e. no."),
+    ("send it, e.g. by friday. then call", "Send it, e.g. by friday. Then call."),
+    ("is it done. we met dr. jones", "Is it done. We met dr. jones."),
+])
+def test_abbreviations_dont_end_sentences(raw, expected):
+    assert local_formatter.format_text(raw) == expected
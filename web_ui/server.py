@@ -1,19 +1,24 @@
 import os
+import time
 import asyncio
 import subprocess
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import List, Optional
 
 from config import config
 from core.model_manager import model_manager
 from core.hotkey_manager import hotkey_manager
-from core.gemini_formatter import gemini_formatter
+from core.formatter import text_formatter
+from core.metrics import metrics
+from core.history import history_store
+from core.startup import startup_profile
+from core.audio_upload import decoder_for, InvalidAudio, UnsupportedAudio, UploadTooLarge
 import sounddevice as sd
-import torch
 
 # Global reference to the main application controller
 # This will be set by main.py
@@ -35,6 +40,11 @@ class Settings(BaseModel):
     hotkey: str
     gemini_api_key: str
     gemini_model: str
+    formatter_backend: Optional[str] = "gemini"
+    openai_base_url: Optional[str] = "http://127.0.0.1:8080/v1"
+    openai_api_key: Optional[str] = ""
+    openai_model: Optional[str] = ""
+    openai_stream: Optional[bool] = True
     device: Optional[str] = "auto"
 
 def get_cpu_name():
@@ -49,27 +59,48 @@ def get_cpu_name():
         pass
     return "Generic CPU"
 
+def get_gpu_info():
+    # Name and memory of the first GPU from nvidia-smi, so the dashboard
+    # doesn't need torch just for this
+    try:
+        output = subprocess.check_output(
+            ["nvidia-smi", "--query-gpu=name,memory.total,memory.free", "--format=csv,noheader,nounits"],
+            timeout=5
+        ).decode().strip()
+        name, total, free = [p.strip() for p in output.split('\n')[0].split(',')]
+        return {"name": name, "vram_total_gb": float(total) / 1024, "vram_free_gb": float(free) / 1024}
+    except:
+        return None
+
 # Websocket for real-time status updates
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        self.loop = None  # uvicorn's event loop, captured on the first connection
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
+        self.loop = asyncio.get_running_loop()
         self.active_connections.append(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        if websocket in self.active_connections:
+            self.active_connections.remove(websocket)
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
+        # Iterate over a copy, dead sockets are dropped as we go
+        for connection in list(self.active_connections):
             try:
                 await connection.send_json(message)
-            except:
-                pass
+            except Exception:
+                self.disconnect(connection)
 
 manager = ConnectionManager()
 
+# Bounds concurrent /api/transcribe requests, created on first use so it
+# belongs to uvicorn's event loop
+transcribe_slots = None
+
 @app.get("/")
 async def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -77,14 +108,25 @@ async def read_root(request: Request):
 @app.get("/api/status")
 async def get_status():
     if controller:
-        return {
-            "is_recording": controller.is_recording,
-            "status_text": controller.status,
-            "last_action": controller.last_action,
-            "last_transcription": controller.last_transcription
-        }
+        return controller.status_payload()
     return {}
 
+@app.get("/api/metrics")
+async def get_metrics():
+    # Prometheus text exposition format
+    if controller:
+        metrics.set("queue_depth", controller.jobs.stats()["queue_depth"])
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/history")
+async def get_history(q: Optional[str] = None, before: Optional[int] = None, limit: int = 50):
+    # Newest first. For the next page pass the previous response's
+    # next_before, it is null on the last page.
+    try:
+        return await run_in_threadpool(history_store.search, q, before, limit)
+    except Exception as e:
+        return JSONResponse({"error": f"History search failed: {e}"}, status_code=500)
+
 @app.post("/api/record/toggle")
 async def toggle_recording():
     if controller:
@@ -95,6 +137,62 @@ async def toggle_recording():
         return {"status": "toggled"}
     return {"error": "Controller not ready"}
 
+@app.post("/api/jobs/cancel")
+async def cancel_jobs():
+    if controller:
+        cancelled = controller.jobs.cancel_all()
+        return {"status": "cancelled", "jobs": cancelled}
+    return {"error": "Controller not ready"}
+
+@app.post("/api/transcribe")
+async def transcribe_upload(request: Request, sample_rate: int = 16000, channels: int = 1, format: str = "s16le"):
+    # Body is the audio itself: WAV, FLAC or raw PCM (audio/L16, audio/pcm,
+    # application/octet-stream with sample_rate/channels/format query params).
+    # It is decoded as it streams in, the model runs off the event loop.
+    global transcribe_slots
+    if transcribe_slots is None:
+        transcribe_slots = asyncio.Semaphore(config.api_max_concurrent_transcriptions)
+    if transcribe_slots.locked():
+        return JSONResponse({"error": "Too many transcriptions in progress"}, status_code=429)
+
+    async with transcribe_slots:
+        start = time.perf_counter()
+        try:
+            decoder = decoder_for(request.headers.get("content-type"), sample_rate, channels, format)
+            async for chunk in request.stream():
+                decoder.feed(chunk)
+            audio = await run_in_threadpool(decoder.finish)
+        except InvalidAudio as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        except UnsupportedAudio as e:
+            return JSONResponse({"error": str(e)}, status_code=415)
+        except UploadTooLarge as e:
+            return JSONResponse({"error": str(e)}, status_code=413)
+        except Exception as e:
+            return JSONResponse({"error": f"Could not decode audio: {e}"}, status_code=400)
+        received = time.perf_counter()
+
+        from core.transcriber import transcriber
+        result = await run_in_threadpool(transcriber.transcribe_detailed, audio)
+        done = time.perf_counter()
+        metrics.observe("stage_seconds", done - received, stage="api_transcribe")
+
+        return {
+            "text": result.text,
+            "segments": result.segments,
+            "language": result.language,
+            "audio_seconds": round(len(audio) / 16000, 3),
+            "timing": {
+                "upload_ms": round((received - start) * 1000, 1),
+                "transcribe_ms": round((done - received) * 1000, 1),
+                "decode_ms": round(result.decode_seconds * 1000, 1),
+                "total_ms": round((done - start) * 1000, 1),
+            },
+            "profile": result.profile,
+            "model": result.model,
+            "route": result.route,
+        }
+
 @app.get("/api/config")
 async def get_config():
     return {
@@ -107,6 +205,11 @@ async def get_config():
         "hotkey": config.hotkey,
         "gemini_api_key": config.gemini_api_key,
         "gemini_model": config.gemini_model,
+        "formatter_backend": config.formatter_backend,
+        "openai_base_url": config.openai_base_url,
+        "openai_api_key": config.openai_api_key,
+        "openai_model": config.openai_model,
+        "openai_stream": config.openai_stream,
         "device": config.device
     }
 
@@ -121,12 +224,19 @@ async def save_config(settings: Settings):
     config.hotkey = settings.hotkey
     config.gemini_api_key = settings.gemini_api_key
     config.gemini_model = settings.gemini_model
+    config.formatter_backend = settings.formatter_backend
+    config.openai_base_url = settings.openai_base_url
+    config.openai_api_key = settings.openai_api_key
+    config.openai_model = settings.openai_model
+    config.openai_stream = settings.openai_stream
     config.device = settings.device
     
     config.save()
     
     # Reload components
-    gemini_formatter.configure()
+    text_formatter.configure()
+    if controller:
+        controller.request_reconfigure_recorder()
     hotkey_manager.stop()
     hotkey_manager.start()
     
@@ -146,24 +256,19 @@ async def get_devices():
 
 @app.get("/api/system-info")
 async def get_system_info():
-    gpu_name = torch.cuda.get_device_name(0) if torch.cuda.is_available() else None
+    from core.transcriber import cuda_available
+    cuda = await run_in_threadpool(cuda_available)
+    gpu = await run_in_threadpool(get_gpu_info) if cuda else None
     cpu_name = get_cpu_name()
-    
-    vram_total = 0
-    vram_free = 0
-    
-    if torch.cuda.is_available():
-        vram_total = torch.cuda.get_device_properties(0).total_memory / 1024**3
-        # Rough estimate of free memory
-        r = torch.cuda.memory_reserved(0)
-        a = torch.cuda.memory_allocated(0)
-        vram_free = (vram_total * 1024**3 - r) / 1024**3 # Very rough
 
     return {
-        "gpu": gpu_name,
+        "gpu": gpu["name"] if gpu else None,
         "cpu": cpu_name,
-        "cuda_available": torch.cuda.is_available(),
-        "vram_total_gb": round(vram_total, 2),
+        "cuda_available": cuda,
+        "vram_total_gb": round(gpu["vram_total_gb"], 2) if gpu else 0,
+        "vram_free_gb": round(gpu["vram_free_gb"], 2) if gpu else 0,
+        "startup": startup_profile.summary(),
+        "models_local": model_manager.local_models(),
         "models_available": [
             "tiny", "base", "small", "medium", "large-v3", 
             "large-v3-turbo", "distil-large-v3", "distil-large-v2", 
@@ -208,17 +313,26 @@ async def setup_dns():
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     try:
+        # Current state right away, pushes only carry changes from here on
+        if controller:
+            await websocket.send_json({"type": "status", "payload": controller.status_payload()})
         while True:
             # Keep connection alive
             await websocket.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
 # Helper to push updates from Controller to Web
 def broadcast_update(data):
-    # asyncio.run is blocking, we need to schedule it on the existing loop
-    # But this function is called from a different thread (Main/Qt thread).
-    # We will use run_coroutine_threadsafe if we have access to the loop.
-    # For now, let's rely on the frontend polling every 500ms for status 
-    # which is simpler and robust enough for this use case.
-    pass
+    # Called from the Qt thread and the transcription worker. The send is
+    # scheduled on uvicorn's loop and not waited on, so a slow browser never
+    # holds up recording or decoding.
+    loop = manager.loop
+    if loop is None or not manager.active_connections:
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(manager.broadcast(data), loop)
+    except RuntimeError:
+        pass  # Loop already closed, app is shutting down